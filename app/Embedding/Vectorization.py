@@ -3,10 +3,31 @@ from typing import List, Union
 import hashlib
 import pickle
 import os
+import atexit
+import threading
+import weakref
 import logging
 
 logger = logging.getLogger(__name__)
 
+# 向量缓存有新内容后延迟写盘的秒数，期间的多次更新合并为一次写入
+CACHE_FLUSH_DELAY = 2.0
+
+# 哈希向量各维度取值只由种子(哈希字符的ASCII值 + 维度下标)决定，预先计算每个种子对应的随机数，
+# 避免逐维度重新设置全局随机数种子；十六进制字符ASCII值不超过102，哈希长度为32，种子不超过255
+_HASH_SEED_VALUES = np.array([np.random.RandomState(seed).rand() for seed in range(256)])
+
+# 存活的向量化器，进程退出前统一写出尚未保存的缓存；弱引用不会延长实例及其缓存的生命周期
+# 有待写盘内容的实例由延迟写盘定时器持有引用，写盘前不会被回收
+_live_vectorizers = weakref.WeakSet()
+
+
+@atexit.register
+def _flush_live_vectorizers():
+    """进程退出前写出所有存活向量化器中尚未保存的缓存"""
+    for vectorizer in list(_live_vectorizers):
+        vectorizer.flush_cache()
+
 """
 TODO
 文本向量化
@@ -23,6 +44,11 @@ class TextVectorizer:
         self.vector_dim = vector_dim
         self.cache_file = "vector_cache.pkl"
         self.vector_cache = self._load_cache()
+        self._cache_lock = threading.Lock()
+        self._cache_dirty = False
+        self._flush_timer = None
+        # 进程退出前写出尚未保存的缓存，见 _flush_live_vectorizers
+        _live_vectorizers.add(self)
 
     def _load_cache(self):
         """加载向量缓存"""
@@ -36,10 +62,30 @@ class TextVectorizer:
         return {}
 
     def _save_cache(self):
-        """保存向量缓存"""
+        """标记向量缓存待保存，延迟CACHE_FLUSH_DELAY秒后统一写盘"""
+        with self._cache_lock:
+            self._cache_dirty = True
+            if self._flush_timer is None:
+                self._flush_timer = threading.Timer(CACHE_FLUSH_DELAY, self.flush_cache)
+                self._flush_timer.daemon = True
+                self._flush_timer.start()
+
+    def flush_cache(self):
+        """将向量缓存写入文件，先写临时文件再原子替换，避免写到一半时留下损坏的缓存"""
+        with self._cache_lock:
+            if self._flush_timer is not None:
+                self._flush_timer.cancel()
+                self._flush_timer = None
+            if not self._cache_dirty:
+                return
+            self._cache_dirty = False
+            snapshot = dict(self.vector_cache)
+
+        tmp_file = f"{self.cache_file}.{os.getpid()}.{threading.get_ident()}.tmp"
         try:
-            with open(self.cache_file, 'wb') as f:
-                pickle.dump(self.vector_cache, f)
+            with open(tmp_file, 'wb') as f:
+                pickle.dump(snapshot, f, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(tmp_file, self.cache_file)
         except Exception as e:
             logger.warning(f"保存向量缓存失败: {e}")
 
@@ -52,15 +98,16 @@ class TextVectorizer:
         使用简单的哈希方法将文本转换为向量
         这是一种简化的向量化方法，实际项目中可以替换为更复杂的模型
         """
-        # 使用哈希值生成确定性的向量
-        hash_val = self._hash_text(text)
+        return self._hash_to_vector(self._hash_text(text))
 
+    def _hash_to_vector(self, hash_val: str) -> np.ndarray:
+        """由文本哈希值生成确定性的归一化向量"""
         # 将哈希值转换为数字并生成向量
         vector = np.zeros(self.vector_dim)
-        for i in range(min(len(hash_val), self.vector_dim)):
-            # 使用哈希字符的ASCII值作为种子生成伪随机数
-            np.random.seed(ord(hash_val[i]) + i)
-            vector[i] = np.random.rand()
+        n = min(len(hash_val), self.vector_dim)
+        # 使用哈希字符的ASCII值作为种子生成伪随机数，按种子查表一次性得到所有维度
+        seeds = np.frombuffer(hash_val[:n].encode('ascii'), dtype=np.uint8) + np.arange(n)
+        vector[:n] = _HASH_SEED_VALUES[seeds]
 
         # 归一化向量
         norm = np.linalg.norm(vector)
@@ -78,27 +125,45 @@ class TextVectorizer:
         if not text or len(text.strip()) == 0:
             return np.zeros(self.vector_dim)
             
+        vector, is_new = self._lookup_or_compute(text)
+        if is_new:
+            self._save_cache()
+
+        return vector
+
+    def _lookup_or_compute(self, text: str):
+        """从缓存中获取文本向量，未命中时生成并写入内存缓存，返回(向量, 是否新生成)"""
         # 检查缓存
         text_hash = self._hash_text(text)
-        if text_hash in self.vector_cache:
-            return self.vector_cache[text_hash]
+        vector = self.vector_cache.get(text_hash)
+        if vector is not None:
+            return vector, False
 
-        # 生成向量
-        vector = self._simple_hash_vector(text)
-
-        # 缓存结果
+        # 生成向量并缓存结果
+        vector = self._hash_to_vector(text_hash)
         self.vector_cache[text_hash] = vector
-        self._save_cache()
-
-        return vector
+        return vector, True
 
     def vectorize_texts(self, texts: List[str]) -> List[np.ndarray]:
         """
-        将多个文本转换为向量
+        将多个文本转换为向量，整批处理完后只保存一次缓存文件
         :param texts: 输入文本列表
         :return: 文本向量列表
         """
-        return [self.vectorize_text(text) for text in texts]
+        vectors = []
+        has_new = False
+        for text in texts:
+            if not text or len(text.strip()) == 0:
+                vectors.append(np.zeros(self.vector_dim))
+                continue
+            vector, is_new = self._lookup_or_compute(text)
+            vectors.append(vector)
+            has_new = has_new or is_new
+
+        if has_new:
+            self._save_cache()
+
+        return vectors
 
     def similarity(self, vec1: np.ndarray, vec2: np.ndarray) -> float:
         """
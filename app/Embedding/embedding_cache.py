@@ -0,0 +1,100 @@
+"""
+向量持久化缓存
+基于 SQLite 按 (文本哈希, 模型) 存储向量，按条增量读写，无需每次重写整个缓存文件
+"""
+import hashlib
+import logging
+import sqlite3
+import threading
+from typing import Dict, Iterable
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+# 单条SQL语句中IN子句的最大参数个数（SQLite默认上限为999）
+_SQLITE_MAX_VARIABLES = 900
+
+
+class EmbeddingCache:
+    """
+    向量持久化缓存
+
+    向量以小端 float32 字节串存储，主键为 (文本哈希, 模型)，
+    同一文本在不同模型或不同归一化方式下的向量互不覆盖
+    """
+
+    def __init__(self, db_path: str = "embedding_cache.db"):
+        """
+        初始化向量缓存
+
+        Args:
+            db_path: SQLite 数据库文件路径
+        """
+        self.db_path = db_path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(db_path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS embedding_cache ("
+            "hash TEXT NOT NULL, model TEXT NOT NULL, dim INTEGER NOT NULL, vec BLOB NOT NULL, "
+            "PRIMARY KEY (hash, model))"
+        )
+        self._conn.commit()
+
+    @staticmethod
+    def hash_text(text: str) -> str:
+        """计算文本的缓存键"""
+        return hashlib.sha256(text.encode('utf-8')).hexdigest()
+
+    def get_many(self, hashes: Iterable[str], model: str) -> Dict[str, np.ndarray]:
+        """
+        批量读取向量
+
+        Args:
+            hashes: 文本哈希列表
+            model: 模型标识
+
+        Returns:
+            命中的 {文本哈希: 向量} 字典
+        """
+        hashes = list(hashes)
+        result = {}
+        try:
+            with self._lock:
+                for start in range(0, len(hashes), _SQLITE_MAX_VARIABLES):
+                    batch = hashes[start:start + _SQLITE_MAX_VARIABLES]
+                    placeholders = ','.join('?' * len(batch))
+                    rows = self._conn.execute(
+                        f"SELECT hash, dim, vec FROM embedding_cache WHERE model = ? AND hash IN ({placeholders})",
+                        (model, *batch)
+                    ).fetchall()
+                    for text_hash, dim, vec in rows:
+                        result[text_hash] = np.frombuffer(vec, dtype='<f4', count=dim).copy()
+        except sqlite3.Error as e:
+            logger.warning(f"读取向量缓存失败：{e}")
+        return result
+
+    def put_many(self, hash_to_vector: Dict[str, np.ndarray], model: str):
+        """
+        批量写入向量
+
+        Args:
+            hash_to_vector: {文本哈希: 向量} 字典
+            model: 模型标识
+        """
+        if not hash_to_vector:
+            return
+        rows = []
+        for text_hash, vector in hash_to_vector.items():
+            vector = np.asarray(vector, dtype='<f4')
+            rows.append((text_hash, model, len(vector), vector.tobytes()))
+        try:
+            with self._lock:
+                self._conn.executemany(
+                    "INSERT OR REPLACE INTO embedding_cache (hash, model, dim, vec) VALUES (?, ?, ?, ?)",
+                    rows
+                )
+                self._conn.commit()
+        except sqlite3.Error as e:
+            logger.warning(f"写入向量缓存失败：{e}")
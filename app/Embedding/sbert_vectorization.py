@@ -7,6 +7,8 @@ from typing import List, Union, Optional
 import logging
 import os
 
+from app.Embedding.embedding_cache import EmbeddingCache
+
 logger = logging.getLogger(__name__)
 
 class SBertVectorizer:
@@ -34,8 +36,10 @@ class SBertVectorizer:
         """
         self.model_name = model_name
         self.cache_enabled = cache_enabled
-        self.cache_file = "sbert_vector_cache.pkl"
+        self.cache_file = "sbert_vector_cache.db"
         self.vector_cache = {}
+        # 持久化缓存按 (文本哈希, 模型) 存储，首次使用时打开
+        self.persistent_cache = None
         
         # 延迟加载模型
         self.model = None
@@ -47,6 +51,10 @@ class SBertVectorizer:
                 from sentence_transformers import SentenceTransformer
                 logger.info(f"正在加载 Sentence-BERT 模型：{self.model_name}")
                 self.model = SentenceTransformer(self.model_name)
+                # sentence-transformers 在有 CUDA 时默认把模型放到 GPU 上，此时改用半精度推理以提高吞吐
+                if self.model.device.type == 'cuda':
+                    self.model.half()
+                    logger.info("模型已在 GPU 上以半精度运行")
                 logger.info("模型加载成功")
             except ImportError:
                 logger.error("未安装 sentence-transformers，请运行：pip install sentence-transformers")
@@ -57,30 +65,48 @@ class SBertVectorizer:
         
         return self.model
     
-    def _load_cache(self):
-        """加载向量缓存"""
-        import pickle
-        if os.path.exists(self.cache_file):
+    def _get_persistent_cache(self) -> Optional[EmbeddingCache]:
+        """获取持久化向量缓存"""
+        if self.persistent_cache is None:
             try:
-                with open(self.cache_file, 'rb') as f:
-                    self.vector_cache = pickle.load(f)
-                logger.info(f"加载了 {len(self.vector_cache)} 条向量缓存")
+                self.persistent_cache = EmbeddingCache(self.cache_file)
             except Exception as e:
-                logger.warning(f"加载缓存失败：{e}")
-                self.vector_cache = {}
+                logger.warning(f"打开向量缓存失败：{e}")
+                self.cache_enabled = False
+        return self.persistent_cache
+    
+    def _cache_model_key(self, normalize: bool) -> str:
+        """持久化缓存中的模型标识，归一化与否的向量分开存储"""
+        return f"{self.model_name}:{'normalized' if normalize else 'raw'}"
     
-    def _save_cache(self):
-        """保存向量缓存"""
-        import pickle
-        if not self.cache_enabled:
+    def _load_cached(self, texts: List[str], normalize: bool) -> dict:
+        """从持久化缓存中批量读取向量，返回 {文本: 向量}，命中的向量同时放入内存缓存"""
+        cache = self._get_persistent_cache()
+        if cache is None:
+            return {}
+        
+        text_hashes = {EmbeddingCache.hash_text(text): text for text in texts}
+        found = cache.get_many(text_hashes, self._cache_model_key(normalize))
+        result = {}
+        for text_hash, vector in found.items():
+            text = text_hashes[text_hash]
+            self.vector_cache[text] = vector
+            result[text] = vector
+        return result
+    
+    def _save_cache(self, text_to_vector: dict, normalize: bool):
+        """将新生成的向量增量写入持久化缓存"""
+        if not self.cache_enabled or not text_to_vector:
             return
         
-        try:
-            with open(self.cache_file, 'wb') as f:
-                pickle.dump(self.vector_cache, f)
-            logger.info(f"已保存 {len(self.vector_cache)} 条向量到缓存")
-        except Exception as e:
-            logger.warning(f"保存缓存失败：{e}")
+        cache = self._get_persistent_cache()
+        if cache is None:
+            return
+        cache.put_many(
+            {EmbeddingCache.hash_text(text): vector for text, vector in text_to_vector.items()},
+            self._cache_model_key(normalize)
+        )
+        logger.info(f"已保存 {len(text_to_vector)} 条向量到缓存")
     
     def vectorize_text(self, text: str, normalize: bool = True) -> np.ndarray:
         """
@@ -100,13 +126,18 @@ class SBertVectorizer:
         if self.cache_enabled and text in self.vector_cache:
             logger.debug(f"使用缓存向量：{text[:50]}...")
             return self.vector_cache[text]
+        if self.cache_enabled:
+            cached = self._load_cached([text], normalize)
+            if text in cached:
+                return cached[text]
         
         # 加载模型（首次调用时）
         model = self._load_model()
         
         # 生成向量
         try:
-            embedding = model.encode(text, convert_to_numpy=True, show_progress_bar=False)
+            # 半精度推理时输出为 float16，统一转换为 float32
+            embedding = model.encode(text, convert_to_numpy=True, show_progress_bar=False).astype(np.float32, copy=False)
             
             # 归一化（用于余弦相似度计算）
             if normalize:
@@ -117,7 +148,7 @@ class SBertVectorizer:
             # 缓存结果
             if self.cache_enabled:
                 self.vector_cache[text] = embedding
-                self._save_cache()
+                self._save_cache({text: embedding}, normalize)
             
             return embedding
             
@@ -154,6 +185,21 @@ class SBertVectorizer:
                 texts_to_process.append(text)
                 indices_map.append(i)
         
+        # 内存缓存未命中的文本再查询持久化缓存
+        if self.cache_enabled and texts_to_process:
+            persisted = self._load_cached(texts_to_process, normalize)
+            if persisted:
+                remaining_texts = []
+                remaining_indices = []
+                for i, text in zip(indices_map, texts_to_process):
+                    if text in persisted:
+                        cached_vectors.append((i, persisted[text]))
+                    else:
+                        remaining_texts.append(text)
+                        remaining_indices.append(i)
+                texts_to_process = remaining_texts
+                indices_map = remaining_indices
+        
         logger.info(f"总共 {len(texts)} 条文本，{len(cached_vectors)} 条来自缓存，{len(texts_to_process)} 条需要处理")
         
         # 批量处理未缓存的文本
@@ -168,7 +214,7 @@ class SBertVectorizer:
                     batch, 
                     convert_to_numpy=True,
                     show_progress_bar=show_progress and (i == 0)
-                )
+                ).astype(np.float32, copy=False)
                 
                 # 归一化
                 if normalize:
@@ -182,7 +228,10 @@ class SBertVectorizer:
                 if self.cache_enabled:
                     for j, text in enumerate(batch):
                         self.vector_cache[text] = processed_vectors[-(len(batch) - j)]
-                    self._save_cache()
+            
+            # 全部批次完成后一次性写入持久化缓存
+            if self.cache_enabled:
+                self._save_cache(dict(zip(texts_to_process, processed_vectors)), normalize)
         
         # 合并结果（保持原始顺序）
         final_vectors = [None] * len(texts)
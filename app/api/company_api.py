@@ -88,9 +88,8 @@ def upload_company_documents():
                 continue
             
             try:
-                # 保存临时文件
-                file_content = file.read()
-                temp_path = file_upload_handler.save_uploaded_file(file_content, file.filename)
+                # 保存临时文件，直接从上传流按块写入磁盘
+                temp_path = file_upload_handler.save_uploaded_file(file.stream, file.filename)
                 
                 # 处理文件并提取文本
                 file_result = document_processor.process_file(temp_path, file.filename)
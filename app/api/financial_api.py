@@ -177,6 +177,9 @@ def build_financial_knowledge_base(company_name: str, documents: List[Dict[str,
             'errors': []
         }
         
+        # 标签生成器在所有文档间复用，其结果缓存可跨文档命中
+        tag_generator = FinancialTagGenerator()
+        
         # 处理每个文档
         for doc_idx, document in enumerate(documents):
             try:
@@ -195,7 +198,6 @@ def build_financial_knowledge_base(company_name: str, documents: List[Dict[str,
                 logger.info(f"文档分割完成，共生成 {len(chunks)} 个文本块")
                 
                 # 2. 为每个文本块添加财务标签
-                tag_generator = FinancialTagGenerator()
                 documents_with_metadata = []
                 
                 for chunk_idx, chunk in enumerate(chunks):
@@ -328,9 +330,8 @@ def query_financial_knowledge():
         
         # 向量化查询文本
         try:
-            from app.Embedding.Vectorization import TextVectorizer
-            vectorizer = TextVectorizer()
-            query_vector = vectorizer.vectorize_text(query_text)
+            from app.Embedding.Vectorization import global_vectorizer
+            query_vector = global_vectorizer.vectorize_text(query_text)
         except ImportError:
             logger.error("无法导入TextVectorizer")
             return error_response("文本向量化模块不可用")
@@ -11,6 +11,7 @@ import time
 import random
 from urllib.parse import urlparse, urljoin
 import datetime
+from charset_normalizer import from_bytes
 
 """
 TODO
@@ -21,6 +22,33 @@ Agent没有抽出来
 
 # TODO 创建文本提取Agent
 
+# 编码探测缓存：host -> encoding，同一站点只做一次统计探测
+_HOST_ENCODING_CACHE: Dict[str, str] = {}
+_CHARSET_RE = re.compile(r'charset=["\']?([\w\-]+)', re.IGNORECASE)
+
+
+def _detect_encoding(response) -> str:
+    """
+    确定响应编码：优先使用Content-Type声明的charset，缺失时才用charset-normalizer探测
+    :param response: requests响应对象
+    :return: 编码名称
+    """
+    charset_match = _CHARSET_RE.search(
+        response.headers.get('content-type', ''))
+    if charset_match:
+        return charset_match.group(1)
+
+    host = urlparse(response.url).netloc
+    cached = _HOST_ENCODING_CACHE.get(host)
+    if cached:
+        return cached
+
+    # 只取前8KB做探测，避免对整个页面做统计分析
+    best = from_bytes(response.content[:8192]).best()
+    encoding = best.encoding if best else 'utf-8'
+    _HOST_ENCODING_CACHE[host] = encoding
+    return encoding
+
 
 def creat_llm(model="qwen-plus"):
     return ChatOpenAI(
@@ -176,8 +204,7 @@ def fetch_financeWeb_data(source: Union[Source, str]) -> List[Dict[str, Any]]:
                 response.raise_for_status()
 
                 # 处理编码
-                if response.encoding == 'ISO-8859-1':
-                    response.encoding = response.apparent_encoding
+                response.encoding = _detect_encoding(response)
 
                 html_content = response.text
 
@@ -381,8 +408,7 @@ def fetch_article_content_simple(url, headers=None):
         response.raise_for_status()  # 检查HTTP错误
 
         # 自动检测和设置编码
-        if response.encoding == 'ISO-8859-1':
-            response.encoding = response.apparent_encoding
+        response.encoding = _detect_encoding(response)
 
         html_content = response.text
 
@@ -708,8 +734,7 @@ def fetch_newsWeb_data(source: Source) -> List[str]:
                 response.raise_for_status()
 
                 # 处理编码
-                if response.encoding == 'ISO-8859-1':
-                    response.encoding = response.apparent_encoding
+                response.encoding = _detect_encoding(response)
 
                 html_content = response.text
 
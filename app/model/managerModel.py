@@ -7,11 +7,28 @@
 import os
 import sys
 import logging
+import threading
+import types
+from concurrent.futures import ThreadPoolExecutor
 from typing import Dict, Any, Optional, TypeVar, Generic, Union
 import json
+import re
 import yaml
 from dotenv import load_dotenv
 
+# 优先使用orjson解析JSON，未安装时回退到标准库
+try:
+    import orjson
+    _json_loads = orjson.loads
+except ImportError:
+    _json_loads = json.loads
+
+# 优先使用LibYAML的C解析器，未编译LibYAML时回退到纯Python实现
+try:
+    from yaml import CSafeLoader as _YamlSafeLoader
+except ImportError:
+    from yaml import SafeLoader as _YamlSafeLoader
+
 # 设置日志配置
 logging.basicConfig(
     level=logging.INFO,
@@ -22,11 +39,22 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+# 环境变量值解析用的查找表和数字正则
+_ENV_LITERALS = {'true': True, 'false': False, 'null': None, 'none': None}
+# 整数，或带小数点（可带指数部分，如 1.5e3）的浮点数；不带小数点的指数形式与原先一样按字符串处理
+_ENV_NUMBER_RE = re.compile(r'^[+-]?(?:\d+|(?:\d+\.\d*|\.\d+)(?:[eE][+-]?\d+)?)$')
+_MISSING = object()
+
+# 已加载过的.env文件（绝对路径）
+_loaded_env_files = set()
+
 
 class ModelConfig:
     """
     模型配置类，用于存储和管理模型的配置参数
     """
+    __slots__ = ('model_name', 'parameters', '_dict_cache')
+    
     def __init__(self, model_name: str, **kwargs):
         """
         初始化模型配置
@@ -37,6 +65,8 @@ class ModelConfig:
         """
         self.model_name = model_name
         self.parameters = kwargs
+        # to_dict()结果缓存，set()时失效
+        self._dict_cache: Optional[Dict[str, Any]] = None
         
     def get(self, key: str, default: Any = None) -> Any:
         """
@@ -60,15 +90,19 @@ class ModelConfig:
             value: 参数值
         """
         self.parameters[key] = value
+        self._dict_cache = None
     
     def to_dict(self) -> Dict[str, Any]:
         """
         转换为字典格式
+        结果会被缓存，调用方不应修改返回的字典
         
         Returns:
             配置字典
         """
-        return {"model_name": self.model_name, **self.parameters}
+        if self._dict_cache is None:
+            self._dict_cache = {"model_name": self.model_name, **self.parameters}
+        return self._dict_cache
 
 
 class ModelManager:
@@ -77,25 +111,34 @@ class ModelManager:
     提供模型创建、配置和管理的基础功能
     """
     
-    _instance = None
+    # 按类分别保存单例，避免子类共享基类（或其他子类）的实例
+    _instances: Dict[type, 'ModelManager'] = {}
     
     def __new__(cls, *args, **kwargs):
         """
         单例模式实现
         """
-        if cls._instance is None:
-            cls._instance = super(ModelManager, cls).__new__(cls)
-        return cls._instance
+        instance = ModelManager._instances.get(cls)
+        if instance is None:
+            instance = super(ModelManager, cls).__new__(cls)
+            instance._initialized = False
+            ModelManager._instances[cls] = instance
+        return instance
     
     def __init__(self):
         """
         初始化模型管理器
         """
-        if not hasattr(self, 'models'):
-            self.models = {}
-            self.default_model = None
-            self.configs = {}
-            logger.info("模型管理器初始化完成")
+        # 单例已初始化时直接返回，子类在调用super().__init__()之前做同样的检查
+        if self._initialized:
+            return
+        self.models = {}
+        self.default_model = None
+        self.configs = {}
+        # 保护models/configs/default_model，支持并行批量创建
+        self._lock = threading.RLock()
+        self._initialized = True
+        logger.info("模型管理器初始化完成")
     
     def create_model(self, config: ModelConfig) -> Any:
         """
@@ -145,9 +188,10 @@ class ModelManager:
             model: 模型实例
             set_default: 是否设置为默认模型
         """
-        self.models[model_name] = model
-        if set_default or len(self.models) == 1:
-            self.default_model = model_name
+        with self._lock:
+            self.models[model_name] = model
+            if set_default or len(self.models) == 1:
+                self.default_model = model_name
         logger.info(f"模型 {model_name} 注册完成")
     
     def unregister_model(self, model_name: str) -> None:
@@ -160,12 +204,13 @@ class ModelManager:
         Raises:
             ValueError: 模型不存在
         """
-        if model_name not in self.models:
-            raise ValueError(f"模型 {model_name} 不存在")
-        
-        del self.models[model_name]
-        if self.default_model == model_name:
-            self.default_model = next(iter(self.models.keys()), None)
+        with self._lock:
+            if model_name not in self.models:
+                raise ValueError(f"模型 {model_name} 不存在")
+            
+            del self.models[model_name]
+            if self.default_model == model_name:
+                self.default_model = next(iter(self.models.keys()), None)
         logger.info(f"模型 {model_name} 注销完成")
     
     def set_default_model(self, model_name: str) -> None:
@@ -199,6 +244,18 @@ class ModelFactory:
     模型工厂类，用于创建不同类型的模型实例
     """
     _model_creators = {}
+    _frozen = False
+    
+    @classmethod
+    def freeze(cls) -> None:
+        """
+        冻结创建器注册表，应用启动完成全部注册后调用
+        冻结后注册表变为只读映射，不能再注册或注销创建器
+        """
+        if not cls._frozen:
+            cls._model_creators = types.MappingProxyType(dict(cls._model_creators))
+            cls._frozen = True
+            logger.info(f"模型创建器注册表已冻结，共 {len(cls._model_creators)} 个创建器")
     
     @classmethod
     def register_creator(cls, model_type: str, creator_func) -> None:
@@ -208,7 +265,12 @@ class ModelFactory:
         Args:
             model_type: 模型类型
             creator_func: 创建模型的函数
+            
+        Raises:
+            RuntimeError: 注册表已冻结
         """
+        if cls._frozen:
+            raise RuntimeError(f"模型创建器注册表已冻结，无法注册 {model_type}")
         cls._model_creators[model_type] = creator_func
         logger.info(f"模型创建器 {model_type} 注册完成")
     
@@ -219,7 +281,12 @@ class ModelFactory:
         
         Args:
             model_type: 模型类型
+            
+        Raises:
+            RuntimeError: 注册表已冻结
         """
+        if cls._frozen:
+            raise RuntimeError(f"模型创建器注册表已冻结，无法注销 {model_type}")
         if model_type in cls._model_creators:
             del cls._model_creators[model_type]
             logger.info(f"模型创建器 {model_type} 注销完成")
@@ -239,11 +306,12 @@ class ModelFactory:
         Raises:
             ValueError: 模型类型不存在
         """
-        if model_type not in cls._model_creators:
+        creator = cls._model_creators.get(model_type)
+        if creator is None:
             raise ValueError(f"未知的模型类型: {model_type}")
         
         try:
-            return cls._model_creators[model_type](**kwargs)
+            return creator(**kwargs)
         except Exception as e:
             logger.error(f"创建模型 {model_type} 失败: {str(e)}")
             raise
@@ -259,6 +327,8 @@ class EnhancedModelManager(ModelManager):
         """
         初始化增强模型管理器
         """
+        if self._initialized:
+            return
         super(EnhancedModelManager, self).__init__()
         self.model_factory = ModelFactory()
         logger.info("增强模型管理器初始化完成")
@@ -280,11 +350,12 @@ class EnhancedModelManager(ModelManager):
             # 使用工厂创建模型
             model = self.model_factory.create(model_type, **model_params)
             
-            # 缓存配置
-            self.configs[config.model_name] = config
-            
-            # 注册模型
-            self.register_model(config.model_name, model)
+            with self._lock:
+                # 缓存配置
+                self.configs[config.model_name] = config
+                
+                # 注册模型
+                self.register_model(config.model_name, model)
             
             logger.info(f"成功创建并注册模型: {config.model_name}")
             return model
@@ -346,7 +417,7 @@ class EnhancedModelManager(ModelManager):
         was_default = self.default_model == model_name
         
         # 创建新模型
-        new_model = self.create_model(self.configs[model_name].__class__(**self.configs[model_name].to_dict()))
+        new_model = self.create_model(self.configs[model_name])
         
         # 恢复默认设置
         if was_default:
@@ -355,32 +426,50 @@ class EnhancedModelManager(ModelManager):
         logger.info(f"模型 {model_name} 重新加载完成")
         return new_model
     
-    def batch_create_models(self, config_list: list) -> Dict[str, Any]:
+    def batch_create_models(self, config_list: list, max_workers: Optional[int] = None) -> Dict[str, Any]:
         """
         批量创建模型
         
         Args:
             config_list: 配置列表
+            max_workers: 并行创建的线程数，为None或1时串行创建
             
         Returns:
             模型实例字典
         """
-        results = {}
+        # 先在当前线程中准备配置对象
+        prepared = []
         for config in config_list:
             try:
                 if isinstance(config, dict):
-                    config_obj = ModelConfig(**config)
+                    prepared.append(ModelConfig(**config))
                 elif isinstance(config, ModelConfig):
-                    config_obj = config
+                    prepared.append(config)
                 else:
                     raise ValueError("配置必须是字典或ModelConfig对象")
-                    
-                model = self.create_model(config_obj)
-                results[config_obj.model_name] = model
+            except Exception as e:
+                logger.error(f"批量创建模型失败: {str(e)}")
+        
+        results = {}
+        
+        def collect(config_obj: ModelConfig, get_model) -> None:
+            try:
+                results[config_obj.model_name] = get_model()
             except Exception as e:
                 logger.error(f"批量创建模型失败: {str(e)}")
                 results[config_obj.model_name] = None
         
+        if max_workers and max_workers > 1 and len(prepared) > 1:
+            # 模型创建多为I/O密集（加载权重、远程配置），使用线程池并行
+            with ThreadPoolExecutor(max_workers=max_workers) as executor:
+                futures = [(config_obj, executor.submit(self.create_model, config_obj))
+                           for config_obj in prepared]
+            for config_obj, future in futures:
+                collect(config_obj, future.result)
+        else:
+            for config_obj in prepared:
+                collect(config_obj, lambda: self.create_model(config_obj))
+        
         return results
 
 
@@ -399,13 +488,19 @@ class ConfigLoader:
         """
         self.env_file = env_file
         self.config_cache = {}
+        # 环境变量中的模型配置缓存，见get_model_config_from_env
+        self._model_env_items: Optional[list] = None
+        self._env_model_cache: Dict[str, Dict[str, Any]] = {}
         
-        # 尝试加载.env文件
-        try:
-            load_dotenv(env_file)
-            logger.info(f"成功加载环境变量文件: {env_file}")
-        except Exception as e:
-            logger.warning(f"加载环境变量文件失败: {str(e)}")
+        # 尝试加载.env文件，同一文件在进程内只加载一次
+        env_path = os.path.abspath(env_file)
+        if env_path not in _loaded_env_files:
+            try:
+                load_dotenv(env_file)
+                _loaded_env_files.add(env_path)
+                logger.info(f"成功加载环境变量文件: {env_file}")
+            except Exception as e:
+                logger.warning(f"加载环境变量文件失败: {str(e)}")
     
     def get_env(self, key: str, default: Any = None) -> Any:
         """
@@ -465,6 +560,36 @@ class ConfigLoader:
             return False
         return default
     
+    def _get_cached_config(self, config_file: str) -> Optional[Dict[str, Any]]:
+        """
+        获取缓存的配置，文件修改时间或大小变化时视为失效
+        
+        Args:
+            config_file: 配置文件路径
+            
+        Returns:
+            缓存的配置字典，未命中时返回None
+        """
+        cached = self.config_cache.get(config_file)
+        if cached is None:
+            return None
+        signature, config = cached
+        stat = os.stat(config_file)
+        if signature != (stat.st_mtime_ns, stat.st_size):
+            return None
+        return config
+    
+    def _set_cached_config(self, config_file: str, config: Dict[str, Any]) -> None:
+        """
+        缓存配置，同时记录文件的修改时间和大小
+        
+        Args:
+            config_file: 配置文件路径
+            config: 配置字典
+        """
+        stat = os.stat(config_file)
+        self.config_cache[config_file] = ((stat.st_mtime_ns, stat.st_size), config)
+    
     def load_json_config(self, config_file: str) -> Dict[str, Any]:
         """
         加载JSON配置文件
@@ -475,15 +600,16 @@ class ConfigLoader:
         Returns:
             配置字典
         """
-        if config_file in self.config_cache:
-            return self.config_cache[config_file]
-        
         try:
-            with open(config_file, 'r', encoding='utf-8') as f:
-                config = json.load(f)
+            cached = self._get_cached_config(config_file)
+            if cached is not None:
+                return cached
+            
+            with open(config_file, 'rb') as f:
+                config = _json_loads(f.read())
             
             # 缓存配置
-            self.config_cache[config_file] = config
+            self._set_cached_config(config_file, config)
             logger.info(f"成功加载JSON配置文件: {config_file}")
             return config
         except Exception as e:
@@ -500,15 +626,16 @@ class ConfigLoader:
         Returns:
             配置字典
         """
-        if config_file in self.config_cache:
-            return self.config_cache[config_file]
-        
         try:
+            cached = self._get_cached_config(config_file)
+            if cached is not None:
+                return cached
+            
             with open(config_file, 'r', encoding='utf-8') as f:
-                config = yaml.safe_load(f)
+                config = yaml.load(f, Loader=_YamlSafeLoader)
             
             # 缓存配置
-            self.config_cache[config_file] = config or {}
+            self._set_cached_config(config_file, config or {})
             logger.info(f"成功加载YAML配置文件: {config_file}")
             return config or {}
         except ImportError:
@@ -549,18 +676,36 @@ class ConfigLoader:
         Returns:
             模型配置字典
         """
-        prefix = f"MODEL_{model_name.upper()}_"
+        name_key = model_name.upper()
+        if name_key in self._env_model_cache:
+            return dict(self._env_model_cache[name_key])
+        
+        if self._model_env_items is None:
+            # 只扫描一次os.environ，保留所有MODEL_前缀的变量
+            self._model_env_items = [(key, value) for key, value in os.environ.items()
+                                     if key.startswith("MODEL_")]
+        
+        # 模型名本身可能包含下划线，因此按完整前缀匹配而不是拆分变量名
+        prefix = f"MODEL_{name_key}_"
         config = {}
         
-        for key, value in os.environ.items():
+        for key, value in self._model_env_items:
             if key.startswith(prefix):
                 config_key = key[len(prefix):].lower()
                 config[config_key] = self._parse_env_value(value)
         
+        self._env_model_cache[name_key] = config
         if config:
             logger.info(f"从环境变量获取模型配置: {model_name}")
         
-        return config
+        return dict(config)
+    
+    def refresh_env(self) -> None:
+        """
+        清空环境变量模型配置缓存，环境变量变化后调用
+        """
+        self._model_env_items = None
+        self._env_model_cache = {}
     
     def _parse_env_value(self, value: str) -> Any:
         """
@@ -575,27 +720,18 @@ class ConfigLoader:
         # 尝试解析JSON
         if value.startswith('{') or value.startswith('['):
             try:
-                return json.loads(value)
+                return _json_loads(value)
             except:
                 pass
         
-        # 尝试解析布尔值
-        value_lower = value.lower()
-        if value_lower == 'true':
-            return True
-        elif value_lower == 'false':
-            return False
-        elif value_lower == 'null' or value_lower == 'none':
-            return None
+        # 布尔值/空值查表
+        literal = _ENV_LITERALS.get(value.lower(), _MISSING)
+        if literal is not _MISSING:
+            return literal
         
-        # 尝试解析数字
-        try:
-            if '.' in value:
-                return float(value)
-            else:
-                return int(value)
-        except:
-            pass
+        # 先用正则判断是否为数字，避免对普通字符串触发异常
+        if _ENV_NUMBER_RE.match(value):
+            return float(value) if '.' in value else int(value)
         
         return value
 
@@ -613,6 +749,8 @@ class ConfigurableModelManager(EnhancedModelManager):
         Args:
             env_file: 环境变量文件路径
         """
+        if self._initialized:
+            return
         super(ConfigurableModelManager, self).__init__()
         self.config_loader = ConfigLoader(env_file)
         logger.info("可配置模型管理器初始化完成")
@@ -654,12 +792,13 @@ class ConfigurableModelManager(EnhancedModelManager):
         # 创建模型
         return self.create_model(model_config)
     
-    def load_models_from_config(self, config_file: str) -> Dict[str, Any]:
+    def load_models_from_config(self, config_file: str, max_workers: Optional[int] = None) -> Dict[str, Any]:
         """
         从配置文件批量加载模型
         
         Args:
             config_file: 包含多个模型配置的文件路径
+            max_workers: 并行创建的线程数，为None或1时串行创建
             
         Returns:
             模型实例字典
@@ -672,7 +811,7 @@ class ConfigurableModelManager(EnhancedModelManager):
             # 如果不是数组，尝试作为单个模型配置处理
             models_config = [models_config]
         
-        results = self.batch_create_models(models_config)
+        results = self.batch_create_models(models_config, max_workers=max_workers)
         logger.info(f"从配置文件加载了 {len(results)} 个模型")
         return results
     
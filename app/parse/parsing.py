@@ -1,6 +1,15 @@
-import re
 import sys
 import os
+import re
+from html import unescape
+
+try:
+    from lxml import html as lxml_html
+    # 容错解析器，模块内复用同一实例
+    _LXML_PARSER = lxml_html.HTMLParser(recover=True)
+except ImportError:
+    lxml_html = None
+    _LXML_PARSER = None
 
 # 添加项目根目录到Python路径
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
@@ -12,14 +21,77 @@ TODO
 效果不好：无效信息没有过滤、数据没有结构化
 """
 
+# 最多返回的文本数量
+_MAX_TEXTS = 20
+
+# script/style 元素（含其内容），提取文本前整体丢弃
+_SCRIPT_STYLE_RE = re.compile(r'<(script|style)\b[^>]*>.*?</\1\s*>', re.IGNORECASE | re.DOTALL)
+
+
+def _strip_tags(text: str) -> str:
+    """
+    去除HTML标签，与正则 <[^>]+> 的替换结果一致
+    使用 str.find 线性扫描，避免正则引擎的开销
+    不转换为bytes处理：纯ASCII文本在CPython中本就按单字节存储，str.find即为字节扫描；
+    而中文文本编码/解码的开销更大，且按字节计算长度会使 len > 5 的过滤失真
+    :param text: 原始文本
+    :return: 去除标签后的文本
+    """
+    if '<' not in text:
+        return text
+
+    parts = []
+    pos = 0
+    search_from = 0
+    while True:
+        lt = text.find('<', search_from)
+        if lt == -1:
+            break
+        gt = text.find('>', lt + 1)
+        if gt == -1:
+            break
+        if gt == lt + 1:
+            # "<>" 不是标签，保留原样继续向后查找
+            search_from = gt
+            continue
+        parts.append(text[pos:lt])
+        pos = search_from = gt + 1
+    parts.append(text[pos:])
+    return ''.join(parts)
+
+
+def _clean_html(text: str) -> str:
+    """
+    提取HTML片段中的纯文本，优先使用lxml（C实现），不可用时回退到 _strip_tags
+    两条路径都会丢弃 script/style 元素并解码HTML实体，保证有无标签的文本清洗结果一致
+    :param text: 原始文本
+    :return: 清洗后的文本
+    """
+    if '<' not in text:
+        return unescape(text)
+
+    if lxml_html is not None:
+        try:
+            fragment = lxml_html.fragment_fromstring(
+                text, create_parent=True, parser=_LXML_PARSER)
+            for element in fragment.xpath('.//script|.//style'):
+                element.drop_tree()
+            # lxml 解析时已解码实体，不再重复 unescape
+            return fragment.text_content()
+        except Exception:
+            pass
+    return unescape(_strip_tags(_SCRIPT_STYLE_RE.sub('', text)))
+
 
 def parse_data(link_texts) -> list[str]:
     cleaned_texts = []
     for text in link_texts:
         # 清理HTML标签
-        clean_text = re.sub(r'<[^>]+>', '', text).strip()
-        if clean_text and len(clean_text) > 5:  # 过滤掉太短的文本
+        clean_text = _clean_html(text).strip()
+        if len(clean_text) > 5:  # 过滤掉太短的文本
             cleaned_texts.append(clean_text)
+            # TODO 返回的数据大小可修改
+            if len(cleaned_texts) == _MAX_TEXTS:  # 凑够前20个文本即停止
+                break
 
-    # TODO 返回的数据大小可修改
-    return cleaned_texts[:20]  # 返回前20个文本
+    return cleaned_texts
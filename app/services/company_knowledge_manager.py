@@ -1,9 +1,27 @@
 # 导入必要的库
 import os
 import json
-from typing import List, Dict, Any, Optional
+import pickle
+import atexit
+import functools
+import hashlib
+import shutil
+import threading
+import time
+import uuid
+import weakref
+from typing import List, Dict, Any, Optional, Set, Iterator
+from collections import defaultdict, OrderedDict
 from datetime import datetime
 import logging
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+import faiss
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
 
 # 导入现有的工具
 from app.chunk.splitter import FinancialTextSplitter
@@ -15,6 +33,48 @@ from app.services.company_service import company_service
 
 logger = logging.getLogger(__name__)
 
+# 单次向量化请求的最大字符数（约对应8k token）
+EMBED_BATCH_MAX_CHARS = 8000
+# 并发请求向量化接口的最大线程数
+EMBED_MAX_WORKERS = 8
+
+# 向量数量达到该阈值后，全局索引从暴力检索切换为HNSW图索引
+HNSW_MIN_VECTORS = 10000
+HNSW_M = 32
+HNSW_EF_CONSTRUCTION = 200
+# HNSW索引中的向量以8bit标量量化存储，训练量化器时最多采样的向量数
+SQ_TRAIN_SAMPLE_SIZE = 50000
+
+# 合并后的全局索引及其文档存储，启动时直接加载，避免逐个公司加载再合并
+GLOBAL_INDEX_FILE = "global.index"
+GLOBAL_DOCSTORE_FILE = "global_docstore.pkl"
+# 全局索引有改动后延迟写盘的秒数，期间的多次增删合并为一次后台写入
+GLOBAL_STORE_FLUSH_DELAY = 5.0
+
+# 公司向量数量达到该阈值后，保存时使用8bit标量量化
+COMPANY_SQ_MIN_VECTORS = 1000
+
+# 启动时并行加载公司向量数据库的最大线程数
+COMPANY_LOAD_MAX_WORKERS = 16
+
+# 查询用的单公司向量库LRU缓存大小
+COMPANY_STORE_CACHE_SIZE = 32
+
+# 查询向量LRU缓存大小
+QUERY_EMBEDDING_CACHE_SIZE = 1024
+
+# 存活的知识库管理器，进程退出前统一写出尚未保存的全局索引；弱引用不会延长实例的生命周期
+# 有待写盘内容的实例由延迟写盘定时器持有引用，写盘前不会被回收
+_live_managers = weakref.WeakSet()
+
+
+@atexit.register
+def _flush_live_managers():
+    """进程退出前写出所有存活管理器中尚未保存的全局索引"""
+    for manager in list(_live_managers):
+        manager.flush_global_store()
+
+
 class CompanyKnowledgeManager:
     """公司知识库管理器，用于管理公司知识库的增删改查"""
     
@@ -23,12 +83,49 @@ class CompanyKnowledgeManager:
         self.embedding_service = EmbeddingService()
         self.knowledge_base_path = "company_knowledge_base"
         
+        # 公司名称 -> 该公司在docstore中的文档ID集合，避免全量扫描docstore
+        self._company_index: Dict[str, Set[str]] = defaultdict(set)
+        
+        # 公司名称 -> 文档名称 -> 文档ID集合，按文档删除和统计时无需逐块读取元数据
+        self._document_index: Dict[str, Dict[str, Set[str]]] = defaultdict(lambda: defaultdict(set))
+        
+        # 公司名称 -> 文本块内容哈希 -> 文档ID，按需从docstore构建，重复文本块复用已有向量
+        self._content_hash_index: Dict[str, Dict[bytes, str]] = {}
+        
+        # 文档ID -> 全局索引中的位置，向量增删后置为None按需重建
+        self._docstore_id_to_index: Optional[Dict[str, int]] = None
+        
+        # 查询只加载目标公司的向量库，按LRU淘汰
+        self._company_store_cache: "OrderedDict[str, Any]" = OrderedDict()
+        
+        # 相同查询文本复用已计算的查询向量，省去一次向量化接口调用
+        self._embed_query = functools.lru_cache(maxsize=QUERY_EMBEDDING_CACHE_SIZE)(self._compute_query_embedding)
+        
         # 确保知识库根目录存在
         if not os.path.exists(self.knowledge_base_path):
             os.makedirs(self.knowledge_base_path)
         
-        # 初始化向量数据库
-        self._initialize_vector_store()
+        # 全局索引的改动先标记为待保存，由后台定时器合并写盘，见 _mark_global_store_dirty
+        # _global_store_lock 保护全局索引的修改和写盘前的快照，_global_store_write_lock 保证按顺序写盘
+        self._global_store_lock = threading.RLock()
+        self._global_store_write_lock = threading.Lock()
+        self._global_store_dirty = False
+        self._global_flush_timer = None
+        _live_managers.add(self)
+        
+        # 全局向量数据库只在增删知识时才需要，首次访问时再初始化
+        self._vector_store = None
+    
+    @property
+    def vector_store(self):
+        """全局向量数据库，首次访问时初始化"""
+        if self._vector_store is None:
+            self._initialize_vector_store()
+        return self._vector_store
+    
+    @vector_store.setter
+    def vector_store(self, value):
+        self._vector_store = value
     
     def _initialize_vector_store(self):
         """初始化向量数据库"""
@@ -52,17 +149,126 @@ class CompanyKnowledgeManager:
         
         # 加载所有公司的向量数据
         self._load_all_company_vectors()
+        self._maybe_upgrade_to_hnsw()
+    
+    def _build_hnsw_index(self, vectors: np.ndarray):
+        """使用给定向量构建HNSW索引，向量以8bit标量量化存储（内存约为float32的1/4）"""
+        index = faiss.IndexHNSWSQ(vectors.shape[1], faiss.ScalarQuantizer.QT_8bit, HNSW_M)
+        index.hnsw.efConstruction = HNSW_EF_CONSTRUCTION
+        
+        train_vectors = vectors
+        if len(vectors) > SQ_TRAIN_SAMPLE_SIZE:
+            sample = np.random.choice(len(vectors), SQ_TRAIN_SAMPLE_SIZE, replace=False)
+            train_vectors = vectors[sample]
+        index.train(train_vectors)
+        index.add(vectors)
+        return index
+    
+    def _maybe_upgrade_to_hnsw(self):
+        """向量数量较多时将暴力检索索引转换为HNSW索引（复用已有向量，不重新向量化）"""
+        index = self.vector_store.index
+        if isinstance(index, faiss.IndexHNSW) or index.ntotal < HNSW_MIN_VECTORS:
+            return
+        self.vector_store.index = self._build_hnsw_index(index.reconstruct_n(0, index.ntotal))
+        logger.info(f"向量数量达到 {index.ntotal}，全局索引已切换为HNSW")
     
     def _load_all_company_vectors(self):
         """加载所有公司的向量数据"""
+        # 优先加载合并后的全局索引
+        if self._load_global_store():
+            logger.info(f"向量数据库初始化完成，从全局索引加载 {len(self.vector_store.index_to_docstore_id)} 个向量")
+            return
+        
         # 获取所有公司列表
         companies = company_service.list_companies()
         
-        for company in companies:
-            self._load_company_vectors(company['company_name'])
+        # 并行读取各公司的向量数据库（I/O密集），合并在当前线程中顺序进行
+        if companies:
+            with ThreadPoolExecutor(max_workers=min(COMPANY_LOAD_MAX_WORKERS, len(companies))) as executor:
+                company_stores = list(executor.map(self._load_company_store, companies))
+            
+            for company, company_vector_store in zip(companies, company_stores):
+                if company_vector_store is not None:
+                    self._merge_company_store(company['company_name'], company_vector_store)
         
+        # 生成全局索引，下次启动直接加载
+        self._save_global_store()
         logger.info(f"向量数据库初始化完成，共加载 {len(self.vector_store.index_to_docstore_id)} 个向量")
     
+    def _load_global_store(self) -> bool:
+        """加载合并后的全局索引和文档存储，成功返回True"""
+        index_path = os.path.join(self.knowledge_base_path, GLOBAL_INDEX_FILE)
+        docstore_path = os.path.join(self.knowledge_base_path, GLOBAL_DOCSTORE_FILE)
+        if not (os.path.exists(index_path) and os.path.exists(docstore_path)):
+            return False
+        
+        try:
+            # 索引类型支持时以内存映射方式读取，不支持时该标志会被忽略
+            index = faiss.read_index(index_path, faiss.IO_FLAG_MMAP)
+            with open(docstore_path, 'rb') as f:
+                docstore_dict, index_to_docstore_id = pickle.load(f)
+        except Exception as e:
+            logger.error(f"加载全局索引失败: {str(e)}")
+            return False
+        
+        self.vector_store.index = index
+        self.vector_store.docstore = InMemoryDocstore(docstore_dict)
+        self.vector_store.index_to_docstore_id = index_to_docstore_id
+        
+        self._company_index = defaultdict(set)
+        self._document_index = defaultdict(lambda: defaultdict(set))
+        self._content_hash_index = {}
+        for doc_id, document in docstore_dict.items():
+            company_name = document.metadata.get("company_name")
+            self._company_index[company_name].add(doc_id)
+            self._document_index[company_name][document.metadata.get("document_name", "")].add(doc_id)
+        self._docstore_id_to_index = None
+        return True
+    
+    def _save_global_store(self):
+        """立即保存合并后的全局索引和文档存储"""
+        with self._global_store_lock:
+            self._global_store_dirty = True
+        self.flush_global_store()
+    
+    def _mark_global_store_dirty(self):
+        """标记全局索引待保存，延迟GLOBAL_STORE_FLUSH_DELAY秒后在后台统一写盘"""
+        with self._global_store_lock:
+            self._global_store_dirty = True
+            if self._global_flush_timer is None:
+                self._global_flush_timer = threading.Timer(GLOBAL_STORE_FLUSH_DELAY, self.flush_global_store)
+                self._global_flush_timer.daemon = True
+                self._global_flush_timer.start()
+    
+    def flush_global_store(self):
+        """将待保存的全局索引和文档存储写入文件，先写临时文件再原子替换"""
+        with self._global_store_write_lock:
+            # 持锁取快照，写盘期间不阻塞对全局索引的增删
+            with self._global_store_lock:
+                if self._global_flush_timer is not None:
+                    self._global_flush_timer.cancel()
+                    self._global_flush_timer = None
+                if not self._global_store_dirty or self._vector_store is None:
+                    return
+                self._global_store_dirty = False
+                index_bytes = faiss.serialize_index(self._vector_store.index)
+                docstore_snapshot = (dict(self._vector_store.docstore._dict), dict(self._vector_store.index_to_docstore_id))
+            
+            try:
+                self._write_file_atomic(GLOBAL_INDEX_FILE, index_bytes.tobytes())
+                self._write_file_atomic(GLOBAL_DOCSTORE_FILE, pickle.dumps(docstore_snapshot, protocol=pickle.HIGHEST_PROTOCOL))
+            except Exception as e:
+                logger.error(f"保存全局索引失败: {str(e)}")
+                self._mark_global_store_dirty()
+    
+    def _write_file_atomic(self, file_name: str, data: bytes):
+        """将数据写入知识库根目录下的文件，先写临时文件再原子替换"""
+        path = os.path.join(self.knowledge_base_path, file_name)
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp_path, 'wb') as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+    
     def _load_company_vectors(self, company_name: str):
         """加载指定公司的向量数据"""
         company_info = company_service.get_company(company_name=company_name)
@@ -70,23 +276,60 @@ class CompanyKnowledgeManager:
             logger.warning(f"公司 {company_name} 不存在")
             return
         
+        company_vector_store = self._load_company_store(company_info)
+        if company_vector_store is not None:
+            self._merge_company_store(company_name, company_vector_store)
+    
+    def _merge_company_store(self, company_name: str, company_vector_store):
+        """将公司的向量数据库合并到全局向量数据库中"""
+        company_index = company_vector_store.index
+        if not isinstance(company_index, faiss.IndexFlat):
+            # 量化存储的公司索引需先解码为暴力检索索引，才能与全局索引合并
+            flat_index = faiss.IndexFlatL2(company_index.d)
+            flat_index.add(company_index.reconstruct_n(0, company_index.ntotal))
+            company_vector_store.index = flat_index
+        self.vector_store.merge_from(company_vector_store)
+        self._company_index[company_name].update(company_vector_store.index_to_docstore_id.values())
+        document_index = self._document_index[company_name]
+        for doc_id, document in company_vector_store.docstore._dict.items():
+            document_index[document.metadata.get("document_name", "")].add(doc_id)
+        self._content_hash_index.pop(company_name, None)
+        self._docstore_id_to_index = None
+        logger.info(f"成功加载公司 {company_name} 的向量数据库")
+    
+    def _load_company_store(self, company_info: Dict[str, Any]):
+        """从磁盘加载公司的向量数据库，不存在或加载失败时返回None"""
         vector_store_path = os.path.join(company_info['knowledge_base_path'], "vector_store")
         
         # 检查向量数据库是否存在
-        if os.path.exists(os.path.join(vector_store_path, "index.faiss")) and os.path.exists(os.path.join(vector_store_path, "index.pkl")):
-            # 加载向量数据库
-            try:
-                company_vector_store = FAISS.load_local(
-                    vector_store_path,
-                    embedding_function=self.embedding_service.get_embedding_model(),
-                    allow_dangerous_deserialization=True
-                )
-                
-                # 将加载的向量数据库合并到全局向量数据库中
-                self.vector_store.merge_from(company_vector_store)
-                logger.info(f"成功加载公司 {company_name} 的向量数据库")
-            except Exception as e:
-                logger.error(f"加载公司 {company_name} 的向量数据库失败: {str(e)}")
+        if not (os.path.exists(os.path.join(vector_store_path, "index.faiss")) and os.path.exists(os.path.join(vector_store_path, "index.pkl"))):
+            return None
+        
+        # 加载向量数据库
+        try:
+            return FAISS.load_local(
+                vector_store_path,
+                embedding_function=self.embedding_service.get_embedding_model(),
+                allow_dangerous_deserialization=True
+            )
+        except Exception as e:
+            logger.error(f"加载公司 {company_info['company_name']} 的向量数据库失败: {str(e)}")
+            return None
+    
+    def _get_company_store(self, company_info: Dict[str, Any]):
+        """获取查询用的公司向量数据库，优先从LRU缓存中获取"""
+        company_name = company_info['company_name']
+        store = self._company_store_cache.get(company_name)
+        if store is not None:
+            self._company_store_cache.move_to_end(company_name)
+            return store
+        
+        store = self._load_company_store(company_info)
+        if store is not None:
+            self._company_store_cache[company_name] = store
+            if len(self._company_store_cache) > COMPANY_STORE_CACHE_SIZE:
+                self._company_store_cache.popitem(last=False)
+        return store
     
     def add_company_knowledge(self, company_name: str, document_content: str, document_name: str = ""):
         """向公司知识库添加文档
@@ -111,18 +354,34 @@ class CompanyKnowledgeManager:
             text_splitter = RecursiveCharacterTextSplitter(chunk_size=1000, chunk_overlap=200)
             documents = text_splitter.create_documents([document_content], metadatas=[{"company_name": company_name, "document_name": document_name}])
         
-            # 添加到向量数据库
-            self.vector_store.add_documents(documents)
-        
-            # 保存公司的向量数据库
-            self._save_company_vector_store(company_name)
-        
-            # 更新公司统计信息
-            company_info = company_service.get_company(company_name=company_name)
-            if company_info:
-                document_count = company_info.get('document_count', 0) + 1
-                chunk_count = company_info.get('chunk_count', 0) + len(documents)
-                company_service.update_company_statistics(company_info['id'], document_count, chunk_count)
+            # 先确保全局向量数据库已加载：去重用到的公司索引在加载时才会重建
+            vector_store = self.vector_store
+        
+            # 批量向量化后添加到向量数据库
+            texts = [document.page_content for document in documents]
+            content_hashes = [self._content_hash(text) for text in texts]
+            embeddings = self._embed_texts_deduplicated(company_name, texts, content_hashes)
+            # 修改全局索引并保存公司向量库期间持锁，避免与后台写盘的快照交错
+            with self._global_store_lock:
+                doc_ids = vector_store.add_embeddings(
+                    text_embeddings=list(zip(texts, embeddings)),
+                    metadatas=[document.metadata for document in documents]
+                )
+                self._get_content_hash_index(company_name).update(zip(content_hashes, doc_ids))
+                self._company_index[company_name].update(doc_ids)
+                self._document_index[company_name][document_name].update(doc_ids)
+                self._docstore_id_to_index = None
+                self._maybe_upgrade_to_hnsw()
+        
+                # 保存公司的向量数据库，全局索引标记为待保存，由后台合并写盘
+                self._save_company_vector_store(company_name, company)
+                self._mark_global_store_dirty()
+        
+            # 更新公司统计信息，复用入口处查询到的公司信息
+            if company:
+                document_count = company.get('document_count', 0) + 1
+                chunk_count = company.get('chunk_count', 0) + len(documents)
+                company_service.update_company_statistics(company['id'], document_count, chunk_count)
         
             logger.info(f"向公司 {company_name} 添加了 {len(documents)} 个文本块")
             return {
@@ -136,9 +395,100 @@ class CompanyKnowledgeManager:
                 "message": f"向公司 {company_name} 添加知识库失败: {str(e)}"
             }
     
-    def _save_company_vector_store(self, company_name: str):
-        """保存公司的向量数据库"""
-        company_info = company_service.get_company(company_name=company_name)
+    def _get_docstore_id_to_index(self) -> Dict[str, int]:
+        """获取文档ID到全局索引位置的映射"""
+        if self._docstore_id_to_index is None:
+            self._docstore_id_to_index = {
+                doc_id: position for position, doc_id in self.vector_store.index_to_docstore_id.items()
+            }
+        return self._docstore_id_to_index
+    
+    def _compute_query_embedding(self, query: str) -> tuple:
+        """计算查询向量，返回元组以便缓存"""
+        return tuple(self.embedding_service.get_embedding_model().embed_query(query))
+    
+    @staticmethod
+    def _content_hash(text: str) -> bytes:
+        """计算文本块内容哈希"""
+        return hashlib.blake2b(text.encode('utf-8'), digest_size=16).digest()
+    
+    def _get_content_hash_index(self, company_name: str) -> Dict[bytes, str]:
+        """获取公司的内容哈希索引，首次使用时从docstore构建"""
+        hash_index = self._content_hash_index.get(company_name)
+        if hash_index is None:
+            docstore = self.vector_store.docstore._dict
+            hash_index = {}
+            for doc_id in self._company_index.get(company_name, ()):
+                document = docstore.get(doc_id)
+                if document:
+                    hash_index[self._content_hash(document.page_content)] = doc_id
+            self._content_hash_index[company_name] = hash_index
+        return hash_index
+    
+    def _embed_texts_deduplicated(self, company_name: str, texts: List[str], content_hashes: List[bytes]) -> List[List[float]]:
+        """向量化文本块，公司内已存在或本批次内重复的文本块只调用一次向量化接口"""
+        hash_index = self._get_content_hash_index(company_name)
+        docstore_id_to_index = self._get_docstore_id_to_index()
+        embeddings = [None] * len(texts)
+        pending = {}
+        for i, content_hash in enumerate(content_hashes):
+            # 已删除文档的哈希记录找不到索引位置，按新文本重新向量化
+            position = docstore_id_to_index.get(hash_index.get(content_hash))
+            if position is not None:
+                embeddings[i] = self.vector_store.index.reconstruct(position).tolist()
+            else:
+                pending.setdefault(content_hash, []).append(i)
+        
+        positions_list = list(pending.values())
+        if positions_list:
+            new_embeddings = self._embed_texts([texts[positions[0]] for positions in positions_list])
+            for positions, embedding in zip(positions_list, new_embeddings):
+                for i in positions:
+                    embeddings[i] = embedding
+        if len(positions_list) < len(texts):
+            logger.info(f"公司 {company_name} 的 {len(texts)} 个文本块中有 {len(texts) - len(positions_list)} 个复用已有向量")
+        return embeddings
+    
+    def _embed_texts(self, texts: List[str]) -> List[List[float]]:
+        """按字符预算分批调用embed_documents，减少向量化接口的调用次数；多个批次并发请求"""
+        embedding_model = self.embedding_service.get_embedding_model()
+        batches = []
+        batch = []
+        batch_chars = 0
+        for text in texts:
+            if batch and batch_chars + len(text) > EMBED_BATCH_MAX_CHARS:
+                batches.append(batch)
+                batch = []
+                batch_chars = 0
+            batch.append(text)
+            batch_chars += len(text)
+        if batch:
+            batches.append(batch)
+        
+        if len(batches) <= 1:
+            return embedding_model.embed_documents(batches[0]) if batches else []
+        
+        # 向量化接口调用以等待网络为主，用线程并发发出各批次请求，map保证结果顺序与输入一致
+        embeddings = []
+        with ThreadPoolExecutor(max_workers=min(EMBED_MAX_WORKERS, len(batches))) as executor:
+            for batch_embeddings in executor.map(embedding_model.embed_documents, batches):
+                embeddings.extend(batch_embeddings)
+        return embeddings
+    
+    def _build_company_index(self, vectors: np.ndarray):
+        """构建公司索引，向量较多时以8bit标量量化存储，落盘体积约为float32的1/4"""
+        if len(vectors) < COMPANY_SQ_MIN_VECTORS:
+            index = faiss.IndexFlatL2(vectors.shape[1])
+        else:
+            index = faiss.IndexScalarQuantizer(vectors.shape[1], faiss.ScalarQuantizer.QT_8bit, faiss.METRIC_L2)
+            index.train(vectors)
+        index.add(vectors)
+        return index
+    
+    def _save_company_vector_store(self, company_name: str, company_info: Optional[Dict[str, Any]] = None):
+        """保存公司的向量数据库，调用方已查询到公司信息时直接传入，避免重复查询数据库"""
+        if company_info is None:
+            company_info = company_service.get_company(company_name=company_name)
         if not company_info:
             logger.warning(f"公司 {company_name} 不存在")
             return
@@ -153,22 +503,38 @@ class CompanyKnowledgeManager:
         try:
             # 获取公司的所有文档
             company_documents = []
-            for doc_id in self.vector_store.index_to_docstore_id.values():
-                document = self.vector_store.docstore.search(doc_id)
-                if document and document.metadata.get("company_name") == company_name:
-                    company_documents.append(document)
+            for doc_id in self._company_index.get(company_name, ()):
+                document = self.vector_store.docstore._dict.get(doc_id)
+                if document:
+                    company_documents.append((doc_id, document))
+            
+            # 公司向量数据库即将变化，使查询缓存失效
+            self._company_store_cache.pop(company_name, None)
             
             # 如果有文档，创建并保存公司向量数据库
             if company_documents:
-                # 创建公司向量数据库
-                company_vector_store = FAISS.from_documents(
-                    company_documents,
-                    embedding=self.embedding_service.get_embedding_model()
+                # 直接从全局索引中取出已有向量构建公司向量数据库，不重新向量化
+                id_to_index = self._get_docstore_id_to_index()
+                global_index = self.vector_store.index
+                vectors = np.vstack([global_index.reconstruct(id_to_index[doc_id]) for doc_id, _ in company_documents])
+                company_index = self._build_company_index(vectors)
+                
+                company_vector_store = FAISS(
+                    embedding_function=self.embedding_service.get_embedding_model(),
+                    index=company_index,
+                    docstore=InMemoryDocstore(dict(company_documents)),
+                    index_to_docstore_id={i: doc_id for i, (doc_id, _) in enumerate(company_documents)}
                 )
                 
                 # 保存公司向量数据库
                 company_vector_store.save_local(vector_store_path)
                 logger.info(f"公司 {company_name} 的向量数据库已保存")
+            else:
+                # 文档已全部删除，移除磁盘上过期的向量数据库
+                for file_name in ("index.faiss", "index.pkl"):
+                    file_path = os.path.join(vector_store_path, file_name)
+                    if os.path.exists(file_path):
+                        os.remove(file_path)
         except Exception as e:
             logger.error(f"保存公司 {company_name} 的向量数据库失败: {str(e)}")
     
@@ -185,20 +551,20 @@ class CompanyKnowledgeManager:
         """
         try:
             # 检查公司是否存在
-            if not company_service.get_company(company_name=company_name):
+            company_info = company_service.get_company(company_name=company_name)
+            if not company_info:
                 return {
                     "success": False,
                     "message": f"公司 {company_name} 不存在"
                 }
         
-            # 执行查询
-            results = self.vector_store.similarity_search_with_score(query, k=top_k)
-        
-            # 过滤出该公司的结果
+            # 执行查询，只在该公司自己的向量库中检索，无需加载全局向量库或按公司过滤结果
             filtered_results = []
-            for result in results:
-                document, score = result
-                if document.metadata.get("company_name") == company_name:
+            company_store = self._get_company_store(company_info)
+            if company_store is not None:
+                query_embedding = list(self._embed_query(query))
+                results = company_store.similarity_search_with_score_by_vector(query_embedding, k=top_k)
+                for document, score in results:
                     filtered_results.append({
                         "content": document.page_content,
                         "score": score,
@@ -245,28 +611,32 @@ class CompanyKnowledgeManager:
                     "message": f"公司 {company_name} 不存在"
                 }
         
-            # 获取要删除的文档ID
-            doc_ids_to_delete = []
-            for doc_id in self.vector_store.index_to_docstore_id.values():
-                document = self.vector_store.docstore.search(doc_id)
-                if document and document.metadata.get("company_name") == company_name:
-                    if not document_name or document.metadata.get("document_name") == document_name:
-                        doc_ids_to_delete.append(doc_id)
-        
-            # 删除文档
-            if doc_ids_to_delete:
-                for doc_id in doc_ids_to_delete:
-                    del self.vector_store.docstore._dict[doc_id]
-                    # 从向量索引中删除
-                    indices_to_delete = [i for i, id in self.vector_store.index_to_docstore_id.items() if id == doc_id]
-                    for index in indices_to_delete:
-                        del self.vector_store.index_to_docstore_id[index]
-        
-                # 重新构建向量索引
-                self._rebuild_vector_index()
+            # 先确保全局向量数据库已加载：加载过程会重建公司和文档索引，之后再读取索引
+            vector_store = self.vector_store
+        
+            # 修改全局索引并保存公司向量库期间持锁，避免与后台写盘的快照交错
+            with self._global_store_lock:
+                # 获取要删除的文档ID
+                company_doc_ids = self._company_index.get(company_name, set())
+                document_index = self._document_index.get(company_name, {})
+                if document_name:
+                    doc_ids_to_delete = list(document_index.pop(document_name, ()))
+                else:
+                    doc_ids_to_delete = list(company_doc_ids)
+                    self._document_index.pop(company_name, None)
+        
+                # 删除文档
+                if doc_ids_to_delete:
+                    for doc_id in doc_ids_to_delete:
+                        del vector_store.docstore._dict[doc_id]
+                
+                    # 直接从向量索引中移除对应位置的向量，无需重新向量化剩余文档
+                    self._remove_vectors(doc_ids_to_delete)
+                    company_doc_ids.difference_update(doc_ids_to_delete)
                 
-                # 保存公司的向量数据库
-                self._save_company_vector_store(company_name)
+                    # 保存公司的向量数据库，全局索引标记为待保存，由后台合并写盘
+                    self._save_company_vector_store(company_name, company_info)
+                    self._mark_global_store_dirty()
         
             # 更新公司统计信息
             if not document_name:
@@ -274,7 +644,7 @@ class CompanyKnowledgeManager:
                 company_service.update_company_statistics(company_info['id'], 0, 0)
             else:
                 # 如果删除单个文档，需要重新计算统计信息
-                self._update_company_statistics(company_name)
+                self._update_company_statistics(company_name, company_info)
         
             logger.info(f"成功删除公司 {company_name} 的知识库")
             return {
@@ -288,45 +658,46 @@ class CompanyKnowledgeManager:
                 "message": f"删除公司 {company_name} 的知识库失败: {str(e)}"
             }
     
-    def _rebuild_vector_index(self):
-        """重新构建向量索引"""
-        # 创建一个新的向量索引
-        dimension = 1536  # 使用OpenAI的text-embedding-3-small模型，输出维度为1536
-        index = faiss.IndexFlatL2(dimension)
-        
-        # 创建一个新的文档存储
-        docstore = InMemoryDocstore({})
-        
-        # 创建一个新的索引到文档的映射
-        index_to_docstore_id = {}
+    def _remove_vectors(self, doc_ids: List[str]):
+        """从向量索引中移除指定文档的向量，并压缩索引位置到文档ID的映射"""
+        doc_ids = set(doc_ids)
+        index_to_docstore_id = self.vector_store.index_to_docstore_id
+        positions = [i for i, doc_id in index_to_docstore_id.items() if doc_id in doc_ids]
+        if not positions:
+            return
         
-        # 重新添加所有文档
-        if self.vector_store.docstore._dict:
-            new_vector_store = FAISS.from_documents(
-                list(self.vector_store.docstore._dict.values()),
-                embedding=self.embedding_service.get_embedding_model()
-            )
-            
-            self.vector_store = new_vector_store
+        index = self.vector_store.index
+        if isinstance(index, faiss.IndexHNSW):
+            # HNSW不支持删除，用保留下来的向量重建图索引
+            keep = np.ones(index.ntotal, dtype=bool)
+            keep[positions] = False
+            vectors = index.reconstruct_n(0, index.ntotal)[keep]
+            if len(vectors) >= HNSW_MIN_VECTORS:
+                self.vector_store.index = self._build_hnsw_index(vectors)
+            else:
+                self.vector_store.index = faiss.IndexFlatL2(index.d)
+                self.vector_store.index.add(vectors)
+        else:
+            # IndexFlatL2.remove_ids会移除向量并将后续向量前移
+            index.remove_ids(np.asarray(positions, dtype='int64'))
+        
+        # 索引位置是从0开始的连续整数，按位置顺序单次遍历重建映射即可，无需排序
+        remaining = (index_to_docstore_id[i] for i in range(len(index_to_docstore_id)))
+        self.vector_store.index_to_docstore_id = dict(enumerate(doc_id for doc_id in remaining if doc_id not in doc_ids))
+        self._docstore_id_to_index = None
     
-    def _update_company_statistics(self, company_name: str):
-        """更新公司统计信息"""
-        company_info = company_service.get_company(company_name=company_name)
+    def _update_company_statistics(self, company_name: str, company_info: Optional[Dict[str, Any]] = None):
+        """更新公司统计信息，调用方已查询到公司信息时直接传入，避免重复查询数据库"""
+        if company_info is None:
+            company_info = company_service.get_company(company_name=company_name)
         if not company_info:
             logger.warning(f"公司 {company_name} 不存在")
             return
         
-        # 计算文档数量和文本块数量
-        document_names = set()
-        chunk_count = 0
-        
-        for doc_id in self.vector_store.index_to_docstore_id.values():
-            document = self.vector_store.docstore.search(doc_id)
-            if document and document.metadata.get("company_name") == company_name:
-                document_names.add(document.metadata.get("document_name", ""))
-                chunk_count += 1
-        
-        document_count = len(document_names)
+        # 按文档名称聚合的索引直接给出文档数量和文本块数量
+        document_index = self._document_index.get(company_name, {})
+        document_count = len(document_index)
+        chunk_count = sum(len(doc_ids) for doc_ids in document_index.values())
         
         # 更新公司统计信息
         company_service.update_company_statistics(company_info['id'], document_count, chunk_count)
@@ -470,7 +841,7 @@ class CompanyKnowledgeManager:
 
 # 导入现有的工具
 from app.chunk.splitter import FinancialTextSplitter
-from app.Embedding.Vectorization import vectorize_data
+from app.Embedding.Vectorization import vectorize_data, global_vectorizer
 from app.store.faiss_store import FaissVectorStore, store_vectors_with_faiss
 
 # 导入自定义模块
@@ -478,6 +849,48 @@ from app.services.company_service import company_service
 
 logger = logging.getLogger(__name__)
 
+# 构建公司知识库时每批向量化并写入索引的最大字符数和最大文本块数
+CHUNK_BATCH_MAX_CHARS = 200000
+CHUNK_BATCH_MAX_CHUNKS = 256
+
+# 文档分块结果LRU缓存大小（按文档数计），重复导入相同内容时跳过分块
+SPLIT_CACHE_SIZE = 64
+
+# 待删除的知识库目录先重命名为带该标记的目录，再在后台线程中删除
+TOMBSTONE_MARKER = ".tombstone."
+
+# 查询结果缓存：(公司, 查询, top_k) -> 结果。本进程内写入知识库时立即失效，
+# 其他进程的写入最多在TTL（秒）后可见；查询向量本身已由向量化器缓存
+QUERY_RESULT_CACHE_TTL = 300
+QUERY_RESULT_CACHE_SIZE = 1024
+
+
+class ChunkMetadataColumns:
+    """
+    文本块元数据（列式存储）
+    每个字段一列，同一文档的所有文本块共享该文档的字段值，避免逐块创建字典
+    """
+    COLUMNS = ('file_name', 'document_type', 'upload_time', 'chunk_index', 'total_chunks', 'company_name', 'year')
+    
+    def __init__(self):
+        self.columns: Dict[str, List[Any]] = {name: [] for name in self.COLUMNS}
+    
+    def add_document(self, company_name: str, doc: Dict[str, Any], total_chunks: int):
+        """追加一个文档所有文本块的元数据"""
+        columns = self.columns
+        upload_time = doc['upload_time'] if 'upload_time' in doc else datetime.now().isoformat()
+        columns['file_name'].extend([doc.get('file_name', 'unknown')] * total_chunks)
+        columns['document_type'].extend([doc.get('document_type', 'general')] * total_chunks)
+        columns['upload_time'].extend([upload_time] * total_chunks)
+        columns['chunk_index'].extend(range(total_chunks))
+        columns['total_chunks'].extend([total_chunks] * total_chunks)
+        columns['company_name'].extend([company_name] * total_chunks)
+        columns['year'].extend([doc.get('year')] * total_chunks)
+    
+    def __len__(self) -> int:
+        return len(self.columns['chunk_index'])
+
+
 class CompanyKnowledgeManager:
     """公司知识库管理器类"""
     
@@ -491,9 +904,39 @@ class CompanyKnowledgeManager:
         self.knowledge_base_path = knowledge_base_path
         self.splitter = FinancialTextSplitter()
         
+        # 查询用的公司向量存储按LRU缓存，避免每次查询都重新读取索引和元数据
+        self._store_cache: "OrderedDict[str, FaissVectorStore]" = OrderedDict()
+        
+        # 文档内容哈希 -> 分块结果，以哈希为键，缓存不持有原文
+        self._split_cache: "OrderedDict[bytes, tuple]" = OrderedDict()
+        
+        # (公司, 查询, top_k) -> (过期时间, 查询结果)
+        self._query_cache: "OrderedDict[tuple, tuple]" = OrderedDict()
+        self._query_cache_lock = threading.Lock()
+        
         # 确保知识库目录存在
         if not os.path.exists(knowledge_base_path):
             os.makedirs(knowledge_base_path)
+        
+        # 清理上次运行中未删除完的知识库目录
+        self._gc_tombstones()
+    
+    def _gc_tombstones(self):
+        """
+        在后台删除知识库目录下残留的待删除目录
+        """
+        try:
+            for entry in os.listdir(self.knowledge_base_path):
+                if TOMBSTONE_MARKER in entry:
+                    self._remove_in_background(os.path.join(self.knowledge_base_path, entry))
+        except Exception as e:
+            logger.error(f"清理待删除的知识库目录时出错: {str(e)}")
+    
+    def _remove_in_background(self, path: str):
+        """
+        在后台线程中删除目录
+        """
+        threading.Thread(target=shutil.rmtree, args=(path,), kwargs={'ignore_errors': True}, daemon=True).start()
     
     def add_company_knowledge(self, company_name: str, documents: List[Dict[str, Any]]) -> Dict[str, Any]:
         """
@@ -523,66 +966,48 @@ class CompanyKnowledgeManager:
             
             company_path = company['knowledge_base_path']
             
-            # 收集所有文本内容并进行分块处理
-            all_chunks = []
-            document_metadata = []
-            
-            for doc in documents:
-                # 使用财务文本分块器处理内容
-                chunks = self.splitter.split_text(doc.get('content', ''))
-                all_chunks.extend(chunks)
-                
-                # 为每个分块记录文档元数据
-                for i, chunk in enumerate(chunks):
-                    chunk_metadata = {
-                        'file_name': doc.get('file_name', 'unknown'),
-                        'document_type': doc.get('document_type', 'general'),
-                        'upload_time': doc.get('upload_time', datetime.now().isoformat()),
-                        'chunk_index': i,
-                        'total_chunks': len(chunks),
-                        'company_name': company_name
-                    }
-                    if 'year' in doc:
-                        chunk_metadata['year'] = doc['year']
-                    document_metadata.append(chunk_metadata)
-            
-            # 向量化处理后的文本块
-            if all_chunks:
-                vectors = vectorize_data(all_chunks)
-                
-                # 创建或加载公司知识库的向量存储
-                company_store = FaissVectorStore(
-                    dimension=len(vectors[0]),
-                    storage_path=os.path.join(company_path, 'faiss_store')
-                )
+            # 分块、向量化、写入索引按批流水线处理，不一次性持有全部文本块和向量
+            company_store = None
+            document_metadata = ChunkMetadataColumns()
+            chunk_count = 0
+            for batch_texts in self._iter_chunk_batches(company_name, documents, document_metadata):
+                vectors = self._vectorize_unique(batch_texts)
                 
-                # 准备来源信息，包含公司名称
-                source_info = f"company_{company_name}"
+                # 首批向量确定维度后创建或加载公司知识库的向量存储
+                if company_store is None:
+                    company_store = FaissVectorStore(
+                        dimension=len(vectors[0]),
+                        storage_path=os.path.join(company_path, 'faiss_store')
+                    )
                 
-                # 添加向量到存储
-                company_store.add_vectors(all_chunks, vectors, source=source_info)
+                # 添加向量到存储，来源信息包含公司名称，全部批次完成后统一保存
+                company_store.add_vectors(batch_texts, vectors, source=f"company_{company_name}", persist=False)
+                chunk_count += len(batch_texts)
+            
+            if company_store is not None:
+                company_store.save()
+                self._store_cache.pop(company_name, None)
+                self._invalidate_query_cache(company_name)
                 
                 # 保存文档元数据
                 self._save_document_metadata(company_path, document_metadata)
                 
                 # 更新公司统计信息
-                document_count = company.get('document_count', 0) + len(documents)
-                chunk_count = company.get('chunk_count', 0) + len(all_chunks)
                 company_service.update_company_statistics(
                     company['id'], 
-                    document_count, 
-                    chunk_count
+                    company.get('document_count', 0) + len(documents), 
+                    company.get('chunk_count', 0) + chunk_count
                 )
                 
-                logger.info(f"公司 {company_name} 知识库构建完成，共添加 {len(documents)} 个文档，{len(all_chunks)} 个文本块")
+                logger.info(f"公司 {company_name} 知识库构建完成，共添加 {len(documents)} 个文档，{chunk_count} 个文本块")
                 
                 return {
                     'status': 'success',
                     'message': f'公司 {company_name} 知识库构建成功',
                     'statistics': {
                         'document_count': len(documents),
-                        'chunk_count': len(all_chunks),
-                        'vector_dimension': len(vectors[0]) if vectors else 0
+                        'chunk_count': chunk_count,
+                        'vector_dimension': company_store.dimension
                     }
                 }
             else:
@@ -604,14 +1029,73 @@ class CompanyKnowledgeManager:
                 'error': str(e)
             }
     
-    def _save_document_metadata(self, company_path: str, metadata_list: List[Dict[str, Any]]):
+    def _iter_chunks(self, company_name: str, documents: List[Dict[str, Any]], metadata: ChunkMetadataColumns) -> Iterator[str]:
+        """
+        逐个文档分块，依次产出文本块，并将各文档的元数据追加到列式元数据中
+        """
+        for doc in documents:
+            # 使用财务文本分块器处理内容
+            chunks = self._split_text(doc.get('content', ''))
+            metadata.add_document(company_name, doc, len(chunks))
+            yield from chunks
+    
+    def _split_text(self, text: str) -> tuple:
+        """
+        分块文本，相同内容的分块结果从LRU缓存中获取
+        """
+        key = hashlib.blake2b(text.encode('utf-8'), digest_size=16).digest()
+        chunks = self._split_cache.get(key)
+        if chunks is not None:
+            self._split_cache.move_to_end(key)
+            return chunks
+        
+        chunks = tuple(self.splitter.split_text(text))
+        self._split_cache[key] = chunks
+        if len(self._split_cache) > SPLIT_CACHE_SIZE:
+            self._split_cache.popitem(last=False)
+        return chunks
+    
+    def _iter_chunk_batches(self, company_name: str, documents: List[Dict[str, Any]], metadata: ChunkMetadataColumns) -> Iterator[List[str]]:
+        """
+        将文本块按字符预算和块数上限分批产出，每批单独向量化并写入索引
+        """
+        batch_texts = []
+        batch_chars = 0
+        for chunk in self._iter_chunks(company_name, documents, metadata):
+            if batch_texts and (batch_chars + len(chunk) > CHUNK_BATCH_MAX_CHARS or len(batch_texts) >= CHUNK_BATCH_MAX_CHUNKS):
+                yield batch_texts
+                batch_texts = []
+                batch_chars = 0
+            batch_texts.append(chunk)
+            batch_chars += len(chunk)
+        if batch_texts:
+            yield batch_texts
+    
+    def _vectorize_unique(self, texts: List[str]) -> List[np.ndarray]:
+        """
+        向量化文本块，重复出现的文本块（页眉、免责声明、表头等）只向量化一次
+        """
+        positions: Dict[str, int] = {}
+        inverse = [positions.setdefault(text, len(positions)) for text in texts]
+        if len(positions) == len(texts):
+            return vectorize_data(texts)
+        
+        unique_vectors = vectorize_data(list(positions))
+        return [unique_vectors[i] for i in inverse]
+    
+    def _save_document_metadata(self, company_path: str, metadata: ChunkMetadataColumns):
         """
-        保存文档元数据
+        保存文档元数据，按列写出 {字段名: 各文本块取值列表}
         """
         metadata_path = os.path.join(company_path, "document_metadata.json")
         try:
-            with open(metadata_path, 'w', encoding='utf-8') as f:
-                json.dump(metadata_list, f, ensure_ascii=False, indent=2)
+            if orjson is not None:
+                # orjson直接输出UTF-8字节，且不做缩进，序列化更快、文件更小
+                with open(metadata_path, 'wb') as f:
+                    f.write(orjson.dumps(metadata.columns))
+            else:
+                with open(metadata_path, 'w', encoding='utf-8') as f:
+                    json.dump(metadata.columns, f, ensure_ascii=False)
         except Exception as e:
             logger.error(f"保存文档元数据失败: {str(e)}")
     
@@ -630,47 +1114,133 @@ class CompanyKnowledgeManager:
             - similarity: 相似度分数
             - metadata: 元数据信息
         """
+        return self.query_company_knowledge_batch(company_name, [query_text], top_k)[0]
+    
+    def query_company_knowledge_batch(self, company_name: str, query_texts: List[str], top_k: int = 5) -> List[List[Dict[str, Any]]]:
+        """
+        批量查询公司知识库，所有查询一次向量化、一次索引搜索
+        
+        参数：
+        - company_name: 公司名称
+        - query_texts: 查询文本列表
+        - top_k: 每个查询返回最相似的前k个结果
+        
+        返回：
+        - 与查询顺序一致的结果列表，每项格式同 query_company_knowledge 的返回值
+        """
+        # 先从结果缓存中取，只对未命中的查询做向量化和搜索
+        all_results: List[Optional[List[Dict[str, Any]]]] = [
+            self._get_cached_query(company_name, query_text, top_k) for query_text in query_texts
+        ]
+        missing = [i for i, results in enumerate(all_results) if results is None]
+        if missing:
+            fetched = self._search_company_knowledge(
+                company_name, [query_texts[i] for i in missing], top_k)
+            for i, results in zip(missing, fetched):
+                all_results[i] = results
+                if results is not None:
+                    self._put_cached_query(company_name, query_texts[i], top_k, results)
+        
+        # 返回结果的副本，调用方修改结果不影响缓存
+        return [[dict(item) for item in results] if results else [] for results in all_results]
+    
+    def _search_company_knowledge(self, company_name: str, query_texts: List[str], top_k: int) -> List[Optional[List[Dict[str, Any]]]]:
+        """
+        向量化查询文本并搜索公司向量存储
+        
+        返回：
+        - 与查询顺序一致的结果列表；知识库不存在或查询出错时各项为 None（不写入缓存）
+        """
+        failed_results = [None] * len(query_texts)
         try:
             # 检查公司是否存在于数据库中
             company = company_service.get_company(company_name=company_name)
             if not company:
                 logger.warning(f"公司 {company_name} 的知识库不存在")
-                return []
+                return failed_results
             
             # 获取公司的知识库路径
             company_path = company.get('knowledge_base_path')
             if not company_path or not os.path.exists(os.path.join(company_path, 'faiss_store')):
                 logger.warning(f"无法找到公司 {company_name} 的向量存储")
-                return []
+                return failed_results
             
-            # 加载公司的向量存储
-            company_store = FaissVectorStore(
-                dimension=128,  # 默认维度，会从文件中自动加载
-                storage_path=os.path.join(company_path, 'faiss_store')
-            )
+            # 获取公司的向量存储
+            company_store = self._get_store(company_name, company_path)
             
-            # 向量化查询文本
-            from app.Embedding.Vectorization import TextVectorizer
-            vectorizer = TextVectorizer()
-            query_vector = vectorizer.vectorize_text(query_text)
+            # 批量向量化查询文本，复用全局向量化器
+            query_vectors = np.asarray(global_vectorizer.vectorize_texts(query_texts), dtype='float32')
+            if query_vectors.shape[1] != company_store.dimension:
+                logger.error(f"公司 {company_name} 的向量维度为 {company_store.dimension}，与查询向量维度 {query_vectors.shape[1]} 不一致")
+                return failed_results
             
             # 查询相似内容
-            results = company_store.search_similar(query_vector, top_k)
+            batch_results = company_store.search_similar_batch(query_vectors, top_k)
             
             # 格式化返回结果
-            formatted_results = []
-            for text, similarity, metadata in results:
-                formatted_results.append({
-                    'text': text,
-                    'similarity': similarity,
-                    'metadata': metadata
-                })
-            
-            return formatted_results
+            return [
+                [
+                    {
+                        'text': text,
+                        'similarity': similarity,
+                        'metadata': metadata
+                    }
+                    for text, similarity, metadata in results
+                ]
+                for results in batch_results
+            ]
         
         except Exception as e:
             logger.error(f"查询公司 {company_name} 知识库时出错: {str(e)}")
-            return []
+            return failed_results
+    
+    def _get_cached_query(self, company_name: str, query_text: str, top_k: int) -> Optional[List[Dict[str, Any]]]:
+        """读取未过期的查询结果缓存，未命中时返回 None"""
+        key = (company_name, query_text, top_k)
+        with self._query_cache_lock:
+            entry = self._query_cache.get(key)
+            if entry is None:
+                return None
+            expires_at, results = entry
+            if expires_at < time.monotonic():
+                del self._query_cache[key]
+                return None
+            self._query_cache.move_to_end(key)
+            return results
+    
+    def _put_cached_query(self, company_name: str, query_text: str, top_k: int, results: List[Dict[str, Any]]):
+        """写入查询结果缓存，超出容量时淘汰最久未使用的条目"""
+        key = (company_name, query_text, top_k)
+        with self._query_cache_lock:
+            self._query_cache[key] = (time.monotonic() + QUERY_RESULT_CACHE_TTL, results)
+            self._query_cache.move_to_end(key)
+            while len(self._query_cache) > QUERY_RESULT_CACHE_SIZE:
+                self._query_cache.popitem(last=False)
+    
+    def _invalidate_query_cache(self, company_name: str):
+        """公司知识库变更后清除该公司的查询结果缓存"""
+        with self._query_cache_lock:
+            for key in [key for key in self._query_cache if key[0] == company_name]:
+                del self._query_cache[key]
+    
+    def _get_store(self, company_name: str, company_path: str) -> FaissVectorStore:
+        """
+        获取公司的向量存储，优先从LRU缓存中获取
+        """
+        store = self._store_cache.get(company_name)
+        if store is not None:
+            self._store_cache.move_to_end(company_name)
+            return store
+        
+        # 已有索引的维度从索引文件中读取，传入的维度只在新建空索引时使用
+        store = FaissVectorStore(
+            dimension=global_vectorizer.vector_dim,
+            storage_path=os.path.join(company_path, 'faiss_store')
+        )
+        self._store_cache[company_name] = store
+        if len(self._store_cache) > COMPANY_STORE_CACHE_SIZE:
+            self._store_cache.popitem(last=False)
+        return store
     
     def list_companies(self) -> List[str]:
         """
@@ -710,11 +1280,19 @@ class CompanyKnowledgeManager:
             if not company:
                 return False
             
-            # 删除公司文件夹
-            import shutil
+            # 删除公司文件夹：先重命名（原子操作，立即生效），再在后台删除，不阻塞请求
+            self._store_cache.pop(company_name, None)
+            self._invalidate_query_cache(company_name)
             company_path = company.get('knowledge_base_path')
             if company_path and os.path.exists(company_path):
-                shutil.rmtree(company_path)
+                tombstone_path = f"{os.path.normpath(company_path)}{TOMBSTONE_MARKER}{uuid.uuid4().hex}"
+                try:
+                    os.rename(company_path, tombstone_path)
+                except OSError as e:
+                    logger.warning(f"重命名公司 {company_name} 的知识库目录失败，改为直接删除: {str(e)}")
+                    shutil.rmtree(company_path)
+                else:
+                    self._remove_in_background(tombstone_path)
             
             # 更新公司统计信息
             company_service.update_company_statistics(
@@ -868,8 +1446,12 @@ class CompanyKnowledgeManager:
         
         # 读取JSON注册表
         try:
-            with open(registry_path, 'r', encoding='utf-8') as f:
-                company_registry = json.load(f)
+            if orjson is not None:
+                with open(registry_path, 'rb') as f:
+                    company_registry = orjson.loads(f.read())
+            else:
+                with open(registry_path, 'r', encoding='utf-8') as f:
+                    company_registry = json.load(f)
         except Exception as e:
             return {
                 'status': 'error',
@@ -1,22 +1,34 @@
 import json
 import os
+import time
 from typing import List, Dict, Any, Optional
 from datetime import datetime
 import logging
 import mysql.connector
 from mysql.connector import Error
 
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
 from app.store.database_service import get_database_connection
 from app.config.config import DB_CONFIG
 
 logger = logging.getLogger(__name__)
 
+# 公司信息查询缓存的有效期（秒）和最大条目数，公司信息变更时整体失效
+COMPANY_CACHE_TTL = 60
+COMPANY_CACHE_MAXSIZE = 1024
+
 class CompanyService:
     """公司信息管理服务类"""
     
     def __init__(self):
         self.db_connection = get_database_connection()
         self.knowledge_base_path = "company_knowledge_base"
+        # (查询字段, 值) -> (过期时间, 公司信息)
+        self._company_cache: Dict[tuple, tuple] = {}
     
     def _execute_query(self, query: str, params: tuple = None, fetch_all: bool = False) -> Any:
         """
@@ -97,6 +109,7 @@ class CompanyService:
         
         # 执行查询获取公司ID
         company_id = self._execute_query(query, tuple(values))
+        self._company_cache.clear()
         
         if not company_id:
             logger.error(f"添加公司 {company_name} 失败，无法获取公司ID")
@@ -117,6 +130,7 @@ class CompanyService:
         # 更新公司信息，设置知识库路径
         update_query = "UPDATE Company SET knowledge_base_path = %s WHERE id = %s"
         update_result = self._execute_query(update_query, (knowledge_base_path, company_id))
+        self._company_cache.clear()
         
         if update_result is not None:
             logger.info(f"公司 {company_name} 已添加，ID: {company_id}")
@@ -155,6 +169,7 @@ class CompanyService:
         # 执行删除查询
         query = f"DELETE FROM Company WHERE {where_clause}"
         result = self._execute_query(query)
+        self._company_cache.clear()
         
         if result is not None:
             # 删除知识库目录
@@ -209,6 +224,7 @@ class CompanyService:
         # 执行更新查询
         query = f"UPDATE Company SET {set_clause_str} WHERE {where_clause}"
         result = self._execute_query(query, tuple(values))
+        self._company_cache.clear()
         
         if result is not None:
             logger.info(f"公司信息已更新")
@@ -218,7 +234,7 @@ class CompanyService:
     
     def get_company(self, company_id: int = None, company_name: str = None) -> Optional[Dict[str, Any]]:
         """
-        查询公司信息
+        查询公司信息，短时间内重复查询同一公司时直接返回缓存结果
         
         参数：
         - company_id: 公司ID（可选）
@@ -233,13 +249,30 @@ class CompanyService:
         
         # 构建WHERE子句
         if company_id:
+            cache_key = ('id', company_id)
             where_clause = f"id = {company_id}"
         else:
+            cache_key = ('company_name', company_name)
             where_clause = f"company_name = '{company_name}'"
         
+        now = time.monotonic()
+        cached = self._company_cache.get(cache_key)
+        if cached is not None and cached[0] > now:
+            # 返回副本，避免调用方修改缓存内容
+            return dict(cached[1])
+        
         # 执行查询
         query = f"SELECT * FROM Company WHERE {where_clause}"
-        return self._execute_query(query, fetch_all=False)
+        company = self._execute_query(query, fetch_all=False)
+        if company:
+            # 同时按ID和名称缓存，两种方式查询同一公司都能命中
+            while len(self._company_cache) >= COMPANY_CACHE_MAXSIZE:
+                self._company_cache.pop(next(iter(self._company_cache), None), None)
+            expires_at = now + COMPANY_CACHE_TTL
+            self._company_cache[('id', company['id'])] = (expires_at, company)
+            self._company_cache[('company_name', company['company_name'])] = (expires_at, company)
+            company = dict(company)
+        return company
     
     def list_companies(self, **filters) -> List[Dict[str, Any]]:
         """
@@ -304,6 +337,7 @@ class CompanyService:
         # 更新公司表中的统计信息
         query = "UPDATE Company SET document_count = %s, chunk_count = %s WHERE id = %s"
         result = self._execute_query(query, (document_count, chunk_count, company_id))
+        self._company_cache.clear()
         
         if result is not None:
             # 添加版本记录
@@ -328,8 +362,12 @@ class CompanyService:
         
         # 读取JSON注册表
         try:
-            with open(registry_path, 'r', encoding='utf-8') as f:
-                company_registry = json.load(f)
+            if orjson is not None:
+                with open(registry_path, 'rb') as f:
+                    company_registry = orjson.loads(f.read())
+            else:
+                with open(registry_path, 'r', encoding='utf-8') as f:
+                    company_registry = json.load(f)
         except Exception as e:
             return {
                 'status': 'error',
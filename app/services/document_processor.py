@@ -1,11 +1,26 @@
 import os
 import re
 import json
-from typing import Dict, List, Any, Tuple, Optional
+import shutil
+from typing import Dict, List, Any, Tuple, Optional, BinaryIO
+from concurrent.futures import ThreadPoolExecutor
 import logging
 
+from charset_normalizer import from_bytes
+
+try:
+    import pypdfium2 as pdfium
+except ImportError:
+    pdfium = None
+
 logger = logging.getLogger(__name__)
 
+# 保存上传文件时每次复制的字节数
+UPLOAD_COPY_BUFFER_SIZE = 1024 * 1024
+
+# 批量处理文件的最大线程数，文件读取和PDF/DOCX解析以I/O和C扩展为主，适合多线程
+MAX_FILE_WORKERS = min(32, (os.cpu_count() or 4) * 4)
+
 """
 文件处理器
 负责从不同类型的文件中提取文本内容
@@ -16,6 +31,9 @@ logger = logging.getLogger(__name__)
 class DocumentProcessor:
     """文档处理器类，支持从多种格式文件中提取文本"""
 
+    # 连续空白字符（含换行、制表符、回车）
+    _RE_WHITESPACE = re.compile(r'\s+')
+
     def __init__(self):
         """初始化文档处理器"""
         # 支持的文件类型及其对应的处理方法
@@ -84,25 +102,17 @@ class DocumentProcessor:
         返回：
         - 处理结果列表，每个结果包含文件名和提取的文本内容
         """
-        results = []
-        for file_path in file_paths:
-            results.append(self.process_file(file_path))
-        return results
+        if len(file_paths) <= 1:
+            return [self.process_file(file_path) for file_path in file_paths]
+
+        # 各文件相互独立，并行处理；map保证结果顺序与输入一致
+        with ThreadPoolExecutor(max_workers=min(MAX_FILE_WORKERS, len(file_paths))) as executor:
+            return list(executor.map(self.process_file, file_paths))
 
     def _process_txt(self, file_path: str) -> str:
         """处理文本文件"""
         try:
-            # 尝试不同编码读取文件
-            encodings = ['utf-8', 'gbk', 'gb2312', 'latin-1']
-            content = ''
-
-            for encoding in encodings:
-                try:
-                    with open(file_path, 'r', encoding=encoding) as f:
-                        content = f.read()
-                    break
-                except UnicodeDecodeError:
-                    continue
+            content = self._read_text(file_path)
 
             # 规范化文本（去除多余空白字符等）
             content = self._normalize_text(content)
@@ -112,19 +122,43 @@ class DocumentProcessor:
             logger.error(f"处理文本文件时出错: {str(e)}")
             return ''
 
+    def _read_text(self, file_path: str) -> str:
+        """
+        读取文本文件并解码，文件只读取一次
+        - 优先按UTF-8解码
+        - 失败时用charset-normalizer检测编码，无法识别时按latin-1解码
+        """
+        with open(file_path, 'rb') as f:
+            raw = f.read()
+
+        try:
+            return raw.decode('utf-8')
+        except UnicodeDecodeError:
+            pass
+
+        match = from_bytes(raw).best()
+        if match is not None:
+            return str(match)
+        return raw.decode('latin-1')
+
     def _process_pdf(self, file_path: str) -> str:
         """处理PDF文件"""
         try:
-            # 使用PyPDF2或pdfplumber库提取文本（这里提供一个基础实现，实际项目中可能需要安装这些库）
+            # 优先使用基于PDFium的pypdfium2提取文本，速度远快于纯Python实现的PyPDF2
+            if pdfium is not None:
+                try:
+                    return self._normalize_text(self._extract_pdf_text_pdfium(file_path))
+                except Exception as e:
+                    logger.warning(f"使用pypdfium2处理PDF时出错，改用PyPDF2: {str(e)}")
+
+            # 使用PyPDF2库提取文本（这里提供一个基础实现，实际项目中可能需要安装这些库）
             # 为了避免依赖问题，提供一个简化版实现
             try:
                 import PyPDF2
-                content = ''
                 with open(file_path, 'rb') as file:
                     reader = PyPDF2.PdfReader(file)
-                    for page in reader.pages:
-                        content += page.extract_text() or ''
-                return self._normalize_text(content)
+                    parts = [page.extract_text() or '' for page in reader.pages]
+                return self._normalize_text('\n'.join(parts))
             except ImportError:
                 logger.warning("未安装PyPDF2库，无法处理PDF文件")
                 # 如果没有相应库，返回一个提示信息而不是空字符串
@@ -137,6 +171,20 @@ class DocumentProcessor:
             logger.error(f"处理PDF文件时出错: {str(e)}")
             return ''
 
+    def _extract_pdf_text_pdfium(self, file_path: str) -> str:
+        """使用pypdfium2逐页提取PDF文本，每页处理完立即释放以控制内存"""
+        pdf = pdfium.PdfDocument(file_path)
+        try:
+            parts = []
+            for page in pdf:
+                textpage = page.get_textpage()
+                parts.append(textpage.get_text_range())
+                textpage.close()
+                page.close()
+            return '\n'.join(parts)
+        finally:
+            pdf.close()
+
     def _process_docx(self, file_path: str) -> str:
         """处理DOCX文件"""
         try:
@@ -174,22 +222,10 @@ class DocumentProcessor:
     def _process_csv(self, file_path: str) -> str:
         """处理CSV文件"""
         try:
-            import csv
-            content = []
-            # 尝试不同编码读取CSV
-            encodings = ['utf-8', 'gbk', 'gb2312']
-
-            for encoding in encodings:
-                try:
-                    with open(file_path, 'r', newline='', encoding=encoding) as csvfile:
-                        reader = csv.reader(csvfile)
-                        for row in reader:
-                            content.append(','.join(row))
-                    break
-                except UnicodeDecodeError:
-                    continue
-
-            return '\n'.join(content)
+            # CSV内容只用于文本检索，直接返回解码后的原文，保留字段中的引号和逗号，
+            # 无需逐行解析再拼接；仅统一换行符并去除末尾换行
+            content = self._read_text(file_path)
+            return content.replace('\r\n', '\n').replace('\r', '\n').rstrip('\n')
         except Exception as e:
             logger.error(f"处理CSV文件时出错: {str(e)}")
             return ''
@@ -200,15 +236,8 @@ class DocumentProcessor:
         - 去除多余的空白字符
         - 统一换行符
         """
-        # 替换连续的空格为单个空格
-        text = re.sub(r'\s+', ' ', text)
-        # 替换制表符、回车符为空格
-        text = text.replace('\t', ' ').replace('\r', ' ')
-        # 替换多个换行为单个换行
-        text = re.sub(r'\n+', '\n', text)
-        # 去除首尾空白
-        text = text.strip()
-        return text
+        # \s已包含制表符、回车符和换行符，一次替换即可把所有连续空白合并为单个空格，再去除首尾空白
+        return self._RE_WHITESPACE.sub(' ', text).strip()
 
 
 """
@@ -232,12 +261,12 @@ class FileUploadHandler:
         if not os.path.exists(upload_dir):
             os.makedirs(upload_dir)
 
-    def save_uploaded_file(self, file_content: bytes, file_name: str) -> str:
+    def save_uploaded_file(self, file_stream: BinaryIO, file_name: str) -> str:
         """
-        保存上传的文件
+        保存上传的文件，按块从流中复制，无需将整个文件读入内存
 
         参数：
-        - file_content: 文件内容（字节形式）
+        - file_stream: 文件内容（二进制流）
         - file_name: 文件名
 
         返回：
@@ -249,8 +278,8 @@ class FileUploadHandler:
             file_path = os.path.join(self.upload_dir, safe_filename)
 
             # 保存文件
-            with open(file_path, 'wb') as f:
-                f.write(file_content)
+            with open(file_path, 'wb', buffering=UPLOAD_COPY_BUFFER_SIZE) as f:
+                shutil.copyfileobj(file_stream, f, UPLOAD_COPY_BUFFER_SIZE)
 
             return file_path
 
@@ -1,5 +1,11 @@
+import copy
+import hashlib
 import json
 import re
+import threading
+from bisect import bisect_left, bisect_right
+from collections import OrderedDict
+from functools import lru_cache
 from typing import Dict, List, Any, Optional
 import logging
 import numpy as np
@@ -7,6 +13,76 @@ from datetime import datetime
 
 logger = logging.getLogger(__name__)
 
+# 可选依赖：pyahocorasick 多模式匹配自动机，未安装时回退到逐关键词 str.find 扫描
+try:
+    import ahocorasick
+except ImportError:
+    ahocorasick = None
+
+# 关键词表 -> 已构建的自动机；自动机构建完成后只读，可在线程间共享
+_AUTOMATON_CACHE = {}
+_AUTOMATON_CACHE_LOCK = threading.Lock()
+
+# 句子分隔符（与原先 re.split 的分句规则保持一致）
+_SENTENCE_DELIMITER_RE = re.compile(r'[。.!?\n]')
+# 带可选中文单位的数值，如 "3.5亿"
+_NUMBER_RE = re.compile(r'\d+(?:\.\d+)?[万亿千百]?')
+# 拆分数值与中文单位
+_CN_NUM_RE = re.compile(r'(\d+(?:\.\d+)?)\s*([万亿千百]*)')
+_YEAR_RE = re.compile(r'20\d{2}')
+_QUARTER_RE = re.compile(r'(第)?([一二三四1234])[季度Qq]')
+
+# 增长率计算所需的历史指标
+HISTORY_METRICS = ('revenue', 'profit')
+# 历史数据数组在指标计算输入中的缓存键
+_HISTORY_ARRAYS_KEY = '_historical_arrays'
+
+# 中文数字单位乘数
+_UNIT_MULTIPLIERS = {
+    '万': 10000,
+    '亿': 100000000,
+    '万亿': 1000000000000,
+}
+
+# 已解析数值的缓存条目数，财务文本中同一数值往往反复出现
+PARSED_NUMBER_CACHE_SIZE = 4096
+
+# 财务健康评估规则：评估维度 -> (指标, 升序阈值, 各区间标签, 区间查找函数)
+# bisect_left 表示"大于阈值"才进入上一档，bisect_right 表示"小于阈值"才留在下一档
+_HEALTH_RULES = {
+    '盈利能力': ('profit_margin', (0, 0.1, 0.2), ('较弱', '一般', '良好', '很强'), bisect_left),
+    '偿债能力': ('debt_to_equity', (0.5, 1, 2), ('很强', '良好', '一般', '较弱'), bisect_right),
+    '短期流动性': ('current_ratio', (1, 1.5, 2), ('较弱', '一般', '良好', '很强'), bisect_left),
+}
+
+# 财务指标的显示名称
+_METRIC_DISPLAY_NAMES = {
+    'profit_margin': '利润率',
+    'return_on_assets': '资产回报率',
+    'debt_to_equity': '债务权益比',
+    'current_ratio': '流动比率',
+    'revenue_growth': '收入增长率',
+    'profit_growth': '利润增长率',
+}
+
+# 比率类指标：(指标名, 分子字段, 分母字段)，同一指标按顺序取第一个可计算的公式
+_RATIO_METRIC_SPECS = (
+    ('profit_margin', 'profit', 'revenue'),          # 利润率 = 利润 / 收入
+    ('return_on_assets', 'profit', 'assets'),        # 资产回报率 = 利润 / 总资产
+    ('debt_to_equity', 'liabilities', 'equity'),     # 债务权益比 = 总负债 / 股东权益
+    ('debt_to_equity', 'debt', 'equity'),            # 没有直接的负债数据时用债务代替
+    ('current_ratio', 'current_assets', 'current_liabilities'),  # 流动比率 = 流动资产 / 流动负债
+)
+_RATIO_METRIC_NAMES = tuple(dict.fromkeys(name for name, _, _ in _RATIO_METRIC_SPECS))
+
+# 以百分比显示的比率类指标
+_PERCENT_METRICS = frozenset({'profit_margin', 'return_on_assets', 'revenue_growth', 'profit_growth'})
+
+# 财务分析结果缓存的最大条目数
+ANALYSIS_CACHE_SIZE = 256
+# 序列化后超过该字节数的输入不做缓存，避免大输入挤占缓存
+ANALYSIS_CACHE_MAX_INPUT_BYTES = 64 * 1024
+
 """
 财务分析接口模块
 提供公司财务数据的分析功能
@@ -19,11 +95,8 @@ class FinancialAnalyzer:
     def __init__(self):
         """初始化财务分析器"""
         # 初始化常用的财务指标计算公式
+        # 利润率、资产回报率等比率类指标由 _calculate_ratio_metrics 按 _RATIO_METRIC_SPECS 一次算出
         self.financial_metrics = {
-            'profit_margin': self._calculate_profit_margin,
-            'return_on_assets': self._calculate_roa,
-            'debt_to_equity': self._calculate_debt_to_equity,
-            'current_ratio': self._calculate_current_ratio,
             'revenue_growth': self._calculate_revenue_growth,
             'profit_growth': self._calculate_profit_growth,
         }
@@ -40,6 +113,13 @@ class FinancialAnalyzer:
             'current_liabilities': ['流动负债', 'current liabilities'],
         }
 
+        # 所有关键词构建一次的多模式匹配自动机
+        self._keyword_automaton = self._build_keyword_automaton()
+
+        # 财务分析结果的 LRU 缓存：输入哈希 -> 分析结果
+        self._analysis_cache = OrderedDict()
+        self._analysis_cache_lock = threading.Lock()
+
     def analyze_financial_data(self, company_name: str, financial_data: Dict[str, Any]) -> Dict[str, Any]:
         """
         分析公司财务数据
@@ -51,6 +131,57 @@ class FinancialAnalyzer:
         返回：
         - 分析结果字典
         """
+        cache_key = self._analysis_cache_key(company_name, financial_data)
+        if cache_key is not None:
+            with self._analysis_cache_lock:
+                cached = self._analysis_cache.get(cache_key)
+                if cached is not None:
+                    self._analysis_cache.move_to_end(cache_key)
+            if cached is not None:
+                logger.debug(f"公司 {company_name} 的财务数据分析命中缓存")
+                results = copy.deepcopy(cached)
+                results['analysis_date'] = datetime.now().isoformat()
+                return results
+
+        results = self._analyze_financial_data(company_name, financial_data)
+
+        # 分析失败的结果不缓存
+        if cache_key is not None and results.get('status') != 'error':
+            with self._analysis_cache_lock:
+                self._analysis_cache[cache_key] = copy.deepcopy(results)
+                self._analysis_cache.move_to_end(cache_key)
+                while len(self._analysis_cache) > ANALYSIS_CACHE_SIZE:
+                    self._analysis_cache.popitem(last=False)
+        return results
+
+    @staticmethod
+    def _analysis_cache_key(company_name: str, financial_data: Dict[str, Any]) -> Optional[bytes]:
+        """
+        计算分析结果缓存键
+
+        参数：
+        - company_name: 公司名称
+        - financial_data: 财务数据字典
+
+        返回：
+        - 公司名称与规范化输入的哈希；输入过大或无法序列化时返回 None
+        """
+        try:
+            payload = json.dumps(financial_data, sort_keys=True, ensure_ascii=False,
+                                 default=str).encode('utf-8')
+        except (TypeError, ValueError):
+            return None
+        if len(payload) > ANALYSIS_CACHE_MAX_INPUT_BYTES:
+            return None
+
+        hasher = hashlib.blake2b(digest_size=16)
+        hasher.update(company_name.encode('utf-8'))
+        hasher.update(b'\0')
+        hasher.update(payload)
+        return hasher.digest()
+
+    def _analyze_financial_data(self, company_name: str, financial_data: Dict[str, Any]) -> Dict[str, Any]:
+        """执行财务数据分析（不经过缓存）"""
         try:
             logger.info(f"开始分析公司 {company_name} 的财务数据")
 
@@ -63,11 +194,26 @@ class FinancialAnalyzer:
                 'analysis_summary': ''
             }
 
+            # 历史数据只转换一次数组，供增长率和趋势分析共用
+            metric_input = financial_data
+            history_arrays = None
+            if isinstance(financial_data.get('historical_data'), list):
+                history_arrays = self._hist_to_arrays(financial_data['historical_data'])
+                metric_input = dict(financial_data)
+                metric_input[_HISTORY_ARRAYS_KEY] = history_arrays
+
             # 计算各种财务指标
+            try:
+                results['financial_metrics'].update(
+                    self._calculate_ratio_metrics(metric_input))
+            except Exception as e:
+                logger.warning(f"计算比率类指标时出错: {str(e)}")
+                results['financial_metrics'].update(
+                    dict.fromkeys(_RATIO_METRIC_NAMES))
             for metric_name, calculator in self.financial_metrics.items():
                 try:
                     results['financial_metrics'][metric_name] = calculator(
-                        financial_data)
+                        metric_input)
                 except Exception as e:
                     logger.warning(f"计算指标 {metric_name} 时出错: {str(e)}")
                     results['financial_metrics'][metric_name] = None
@@ -79,7 +225,7 @@ class FinancialAnalyzer:
             # 分析增长趋势
             if 'historical_data' in financial_data:
                 results['growth_trends'] = self._analyze_growth_trends(
-                    financial_data['historical_data'])
+                    financial_data['historical_data'], history_arrays)
 
             # 生成分析摘要
             results['analysis_summary'] = self._generate_analysis_summary(
@@ -107,9 +253,20 @@ class FinancialAnalyzer:
         """
         extracted_data = {}
 
+        # 句子边界只计算一次，各类别共享；句内数值按句子序号缓存
+        boundaries = self._sentence_boundaries(text)
+        sentence_values = {}
+
         # 尝试提取关键财务数据
-        for key, keywords in self.financial_keywords.items():
-            value = self._extract_value_by_keywords(text, keywords)
+        if self._keyword_automaton is not None:
+            values = self._scan_keywords_with_automaton(text, boundaries, sentence_values)
+        else:
+            values = {
+                key: self._find_keyword_value(text, keywords, boundaries, sentence_values)
+                for key, keywords in self.financial_keywords.items()
+            }
+        for key in self.financial_keywords:
+            value = values.get(key)
             if value:
                 extracted_data[key] = value
 
@@ -139,16 +296,18 @@ class FinancialAnalyzer:
                 "财务指标", "业绩", "盈利", "增长"
             ]
 
-            all_financial_content = []
-            for query in financial_queries:
-                results = knowledge_base.query_company_knowledge(
-                    company_name, query, top_k=3)
-                for result in results:
-                    if result['similarity'] > 0.5:  # 只考虑相似度高的内容
-                        all_financial_content.append(result['text'])
+            # 支持批量查询的知识库一次完成全部查询，否则逐条查询
+            if hasattr(knowledge_base, 'query_company_knowledge_batch'):
+                results_by_query = knowledge_base.query_company_knowledge_batch(
+                    company_name, financial_queries, top_k=3)
+            else:
+                results_by_query = [
+                    knowledge_base.query_company_knowledge(company_name, query, top_k=3)
+                    for query in financial_queries
+                ]
 
             # 合并所有相关内容
-            combined_text = "\n".join(all_financial_content)
+            combined_text = "\n".join(self._select_relevant_texts(results_by_query))
 
             # 从合并的文本中提取财务数据
             extracted_data = self.extract_financial_data_from_text(
@@ -177,6 +336,26 @@ class FinancialAnalyzer:
                 'error': str(e)
             }
 
+    @staticmethod
+    def _select_relevant_texts(results_by_query: List[List[Dict[str, Any]]],
+                               min_similarity: float = 0.5) -> List[str]:
+        """
+        筛选相似度高于阈值的查询结果文本
+
+        参数：
+        - results_by_query: 各查询的结果列表
+        - min_similarity: 相似度阈值，只考虑相似度高的内容
+
+        返回：
+        - 按查询顺序排列的文本列表
+        """
+        return [
+            result['text']
+            for results in results_by_query
+            for result in results
+            if result['similarity'] > min_similarity
+        ]
+
     def generate_financial_report(self, company_name: str, analysis_results: Dict[str, Any]) -> str:
         """
         生成格式化的财务分析报告
@@ -189,241 +368,271 @@ class FinancialAnalyzer:
         - 格式化的报告文本
         """
         try:
-            report = f"# {company_name} 财务分析报告\n\n"
-            report += f"**分析日期**: {analysis_results.get('analysis_date', datetime.now().isoformat())}\n\n"
+            parts: List[str] = [
+                f"# {company_name} 财务分析报告\n\n",
+                f"**分析日期**: {analysis_results.get('analysis_date', datetime.now().isoformat())}\n\n",
+            ]
 
             # 添加财务指标部分
             if analysis_results.get('financial_metrics'):
-                report += "## 财务指标\n\n"
+                parts.append("## 财务指标\n\n")
                 for metric, value in analysis_results['financial_metrics'].items():
                     if value is not None:
-                        report += f"- **{self._get_metric_display_name(metric)}**: {self._format_metric_value(metric, value)}\n"
+                        parts.append(f"- **{self._get_metric_display_name(metric)}**: {self._format_metric_value(metric, value)}\n")
 
             # 添加财务健康状况评估
             if analysis_results.get('financial_health'):
-                report += "\n## 财务健康状况\n\n"
+                parts.append("\n## 财务健康状况\n\n")
                 for aspect, assessment in analysis_results['financial_health'].items():
-                    report += f"- **{aspect}**: {assessment}\n"
+                    parts.append(f"- **{aspect}**: {assessment}\n")
 
             # 添加增长趋势分析
             if analysis_results.get('growth_trends'):
-                report += "\n## 增长趋势\n\n"
+                parts.append("\n## 增长趋势\n\n")
                 for trend, data in analysis_results['growth_trends'].items():
-                    report += f"- **{trend}**: {data}\n"
+                    parts.append(f"- **{trend}**: {data}\n")
 
             # 添加分析摘要
             if analysis_results.get('analysis_summary'):
-                report += "\n## 分析摘要\n\n"
-                report += f"{analysis_results['analysis_summary']}\n"
+                parts.append("\n## 分析摘要\n\n")
+                parts.append(f"{analysis_results['analysis_summary']}\n")
 
-            return report
+            return "".join(parts)
 
         except Exception as e:
             logger.error(f"生成财务报告时出错: {str(e)}")
             return f"生成财务分析报告失败: {str(e)}"
 
     # 各种财务指标计算方法
-    def _calculate_profit_margin(self, data: Dict[str, Any]) -> float:
-        """计算利润率 = 利润 / 收入"""
-        if 'profit' in data and 'revenue' in data and data['revenue'] != 0:
-            return data['profit'] / data['revenue']
-        return None
-
-    def _calculate_roa(self, data: Dict[str, Any]) -> float:
-        """计算资产回报率 = 利润 / 总资产"""
-        if 'profit' in data and 'assets' in data and data['assets'] != 0:
-            return data['profit'] / data['assets']
-        return None
+    @staticmethod
+    def _calculate_ratio_metrics(data: Dict[str, Any]) -> Dict[str, Optional[float]]:
+        """
+        一次向量化计算全部比率类指标
 
-    def _calculate_debt_to_equity(self, data: Dict[str, Any]) -> float:
-        """计算债务权益比 = 总负债 / 股东权益"""
-        if 'liabilities' in data and 'equity' in data and data['equity'] != 0:
-            return data['liabilities'] / data['equity']
-        # 如果没有直接的负债数据，尝试用债务代替
-        elif 'debt' in data and 'equity' in data and data['equity'] != 0:
-            return data['debt'] / data['equity']
-        return None
+        参数：
+        - data: 财务数据字典
 
-    def _calculate_current_ratio(self, data: Dict[str, Any]) -> float:
-        """计算流动比率 = 流动资产 / 流动负债"""
-        if ('current_assets' in data and 'current_liabilities' in data and
-                data['current_liabilities'] != 0):
-            return data['current_assets'] / data['current_liabilities']
-        return None
+        返回：
+        - {指标名: 比率} 字典，缺少数据或分母为0的指标为 None
+        """
+        def to_float(value) -> float:
+            try:
+                return np.nan if value is None else float(value)
+            except (TypeError, ValueError):
+                return np.nan
+
+        numerators = np.array([to_float(data.get(numerator)) for _, numerator, _ in _RATIO_METRIC_SPECS])
+        denominators = np.array([to_float(data.get(denominator)) for _, _, denominator in _RATIO_METRIC_SPECS])
+        values = np.divide(numerators, denominators, out=np.full_like(numerators, np.nan),
+                           where=denominators != 0)
+
+        # 同一指标有多个候选公式时取第一个有效结果
+        metrics = dict.fromkeys(_RATIO_METRIC_NAMES)
+        for (metric_name, _, _), value in zip(_RATIO_METRIC_SPECS, values):
+            if metrics[metric_name] is None and np.isfinite(value):
+                metrics[metric_name] = float(value)
+        return metrics
 
     def _calculate_revenue_growth(self, data: Dict[str, Any]) -> float:
         """计算收入增长率"""
-        if ('historical_data' in data and isinstance(data['historical_data'], list) and
-                len(data['historical_data']) > 1):
-            # 假设历史数据按时间顺序排列，最近的数据在最后
-            current_revenue = data['historical_data'][-1].get('revenue')
-            previous_revenue = data['historical_data'][-2].get('revenue')
-            if current_revenue and previous_revenue and previous_revenue != 0:
-                return (current_revenue - previous_revenue) / previous_revenue
-        return None
+        return self._calculate_latest_growth(data, 'revenue')
 
     def _calculate_profit_growth(self, data: Dict[str, Any]) -> float:
         """计算利润增长率"""
+        return self._calculate_latest_growth(data, 'profit')
+
+    def _calculate_latest_growth(self, data: Dict[str, Any], metric: str) -> Optional[float]:
+        """计算历史数据中最近两期指标的增长率"""
         if ('historical_data' in data and isinstance(data['historical_data'], list) and
                 len(data['historical_data']) > 1):
+            arrays = data.get(_HISTORY_ARRAYS_KEY) or self._hist_to_arrays(data['historical_data'])
             # 假设历史数据按时间顺序排列，最近的数据在最后
-            current_profit = data['historical_data'][-1].get('profit')
-            previous_profit = data['historical_data'][-2].get('profit')
-            if current_profit and previous_profit and previous_profit != 0:
-                return (current_profit - previous_profit) / previous_profit
+            previous, current = arrays[metric][-2:]
+            if np.isfinite(current) and np.isfinite(previous) and current != 0 and previous != 0:
+                return float((current - previous) / previous)
         return None
 
+    @staticmethod
+    def _hist_to_arrays(historical_data: List[Dict[str, Any]]) -> Dict[str, np.ndarray]:
+        """
+        将历史数据转换为按指标划分的数组，缺失或无效的值记为 NaN
+
+        参数：
+        - historical_data: 按时间顺序排列的历史数据列表
+
+        返回：
+        - {指标名: float64 数组} 字典
+        """
+        def to_float(value) -> float:
+            try:
+                return np.nan if value is None else float(value)
+            except (TypeError, ValueError):
+                return np.nan
+
+        return {
+            metric: np.fromiter((to_float(d.get(metric)) for d in historical_data),
+                                dtype=np.float64, count=len(historical_data))
+            for metric in HISTORY_METRICS
+        }
+
     # 辅助方法
     def _evaluate_financial_health(self, metrics: Dict[str, Any]) -> Dict[str, str]:
         """评估公司财务健康状况"""
         health_assessment = {}
 
-        # 评估盈利能力
-        if 'profit_margin' in metrics and metrics['profit_margin'] is not None:
-            if metrics['profit_margin'] > 0.2:
-                health_assessment['盈利能力'] = '很强'
-            elif metrics['profit_margin'] > 0.1:
-                health_assessment['盈利能力'] = '良好'
-            elif metrics['profit_margin'] > 0:
-                health_assessment['盈利能力'] = '一般'
-            else:
-                health_assessment['盈利能力'] = '较弱'
-
-        # 评估偿债能力
-        if 'debt_to_equity' in metrics and metrics['debt_to_equity'] is not None:
-            if metrics['debt_to_equity'] < 0.5:
-                health_assessment['偿债能力'] = '很强'
-            elif metrics['debt_to_equity'] < 1:
-                health_assessment['偿债能力'] = '良好'
-            elif metrics['debt_to_equity'] < 2:
-                health_assessment['偿债能力'] = '一般'
-            else:
-                health_assessment['偿债能力'] = '较弱'
-
-        # 评估短期流动性
-        if 'current_ratio' in metrics and metrics['current_ratio'] is not None:
-            if metrics['current_ratio'] > 2:
-                health_assessment['短期流动性'] = '很强'
-            elif metrics['current_ratio'] > 1.5:
-                health_assessment['短期流动性'] = '良好'
-            elif metrics['current_ratio'] > 1:
-                health_assessment['短期流动性'] = '一般'
-            else:
-                health_assessment['短期流动性'] = '较弱'
+        # 按阈值表评估盈利能力、偿债能力和短期流动性
+        for aspect, (metric, bounds, labels, locate) in _HEALTH_RULES.items():
+            value = metrics.get(metric)
+            if value is not None:
+                health_assessment[aspect] = labels[locate(bounds, value)]
 
         return health_assessment
 
-    def _analyze_growth_trends(self, historical_data: List[Dict[str, Any]]) -> Dict[str, str]:
+    def _analyze_growth_trends(self, historical_data: List[Dict[str, Any]],
+                               arrays: Optional[Dict[str, np.ndarray]] = None) -> Dict[str, str]:
         """分析增长趋势"""
         trends = {}
-
-        # 分析收入趋势
-        revenues = [d.get('revenue')
-                    for d in historical_data if 'revenue' in d]
-        if len(revenues) > 1:
-            growth = (revenues[-1] - revenues[0]) / \
-                revenues[0] if revenues[0] != 0 else 0
-            if growth > 0.3:
-                trends['收入趋势'] = '快速增长'
-            elif growth > 0:
-                trends['收入趋势'] = '稳定增长'
-            else:
-                trends['收入趋势'] = '下降'
-
-        # 分析利润趋势
-        profits = [d.get('profit') for d in historical_data if 'profit' in d]
-        if len(profits) > 1:
-            growth = (profits[-1] - profits[0]) / \
-                profits[0] if profits[0] != 0 else 0
-            if growth > 0.3:
-                trends['利润趋势'] = '快速增长'
-            elif growth > 0:
-                trends['利润趋势'] = '稳定增长'
-            else:
-                trends['利润趋势'] = '下降'
+        if arrays is None:
+            arrays = self._hist_to_arrays(historical_data)
+
+        for metric, label in (('revenue', '收入趋势'), ('profit', '利润趋势')):
+            values = arrays[metric]
+            values = values[np.isfinite(values)]
+            if len(values) > 1:
+                growth = values[-1] / values[0] - 1 if values[0] != 0 else 0
+                if growth > 0.3:
+                    trends[label] = '快速增长'
+                elif growth > 0:
+                    trends[label] = '稳定增长'
+                else:
+                    trends[label] = '下降'
 
         return trends
 
     def _generate_analysis_summary(self, results: Dict[str, Any]) -> str:
         """生成分析摘要"""
-        summary = f"基于对{results['company_name']}财务数据的分析，"
+        parts: List[str] = [f"基于对{results['company_name']}财务数据的分析，"]
 
         # 根据财务健康状况生成摘要
         health = results.get('financial_health', {})
         if health:
             aspects = list(health.keys())
             if len(aspects) > 0:
-                summary += f"该公司的{', '.join(aspects[:-1])}和{aspects[-1]}分别为{', '.join(health.values())}。"
+                parts.append(f"该公司的{', '.join(aspects[:-1])}和{aspects[-1]}分别为{', '.join(health.values())}。")
 
         # 根据增长趋势生成摘要
         trends = results.get('growth_trends', {})
         if trends:
-            summary += f"在增长方面，"
+            parts.append("在增长方面，")
             for trend, status in trends.items():
-                summary += f"{trend}为{status}，"
+                parts.append(f"{trend}为{status}，")
 
         # 添加建议或结论
         if 'debt_to_equity' in results['financial_metrics'] and \
            results['financial_metrics']['debt_to_equity'] is not None and \
            results['financial_metrics']['debt_to_equity'] > 2:
-            summary += "建议关注公司的负债水平，考虑优化资本结构。"
+            parts.append("建议关注公司的负债水平，考虑优化资本结构。")
         elif 'current_ratio' in results['financial_metrics'] and \
              results['financial_metrics']['current_ratio'] is not None and \
              results['financial_metrics']['current_ratio'] < 1:
-            summary += "公司短期偿债能力较弱，需关注现金流状况。"
+            parts.append("公司短期偿债能力较弱，需关注现金流状况。")
         else:
-            summary += "整体来看，公司财务状况基本稳健。"
+            parts.append("整体来看，公司财务状况基本稳健。")
 
-        return summary
+        return "".join(parts)
 
-    def _extract_value_by_keywords(self, text: str, keywords: List[str]) -> Optional[float]:
-        """根据关键词从文本中提取数值"""
+    def _build_keyword_automaton(self):
+        """
+        获取包含全部 (类别, 关键词) 的 Aho-Corasick 自动机，未安装 pyahocorasick 时返回 None
+
+        相同关键词表的自动机在进程内只构建一次，多个分析器实例共享
+        """
+        if ahocorasick is None:
+            return None
+
+        table_key = tuple((category, tuple(keywords)) for category, keywords in self.financial_keywords.items())
+        with _AUTOMATON_CACHE_LOCK:
+            automaton = _AUTOMATON_CACHE.get(table_key)
+            if automaton is None:
+                automaton = _build_automaton(table_key)
+                _AUTOMATON_CACHE[table_key] = automaton
+        return automaton
+
+    @staticmethod
+    def _sentence_boundaries(text: str) -> List[int]:
+        """返回所有句子分隔符的位置，第 i 个句子为第 i-1 与第 i 个分隔符之间的文本"""
+        return [match.start() for match in _SENTENCE_DELIMITER_RE.finditer(text)]
+
+    def _sentence_value(self, text: str, boundaries: List[int], index: int,
+                        cache: Dict[int, Optional[float]]) -> Optional[float]:
+        """提取第 index 个句子中最后一个数值，句子中没有数字时返回 None"""
+        if index in cache:
+            return cache[index]
+
+        start = boundaries[index - 1] + 1 if index > 0 else 0
+        end = boundaries[index] if index < len(boundaries) else len(text)
+        numbers = _NUMBER_RE.findall(text, start, end)
+        # 处理中国数字单位（万亿、亿、万）
+        value = self._parse_chinese_number(numbers[-1]) if numbers else None
+        cache[index] = value
+        return value
+
+    def _scan_keywords_with_automaton(self, text: str, boundaries: List[int],
+                                      cache: Dict[int, Optional[float]]) -> Dict[str, float]:
+        """
+        单次遍历文本，找出每个类别的取值
+
+        每个关键词取其第一个含数字的句子，类别内按关键词顺序取优先级最高的命中
+        """
+        hits: Dict[str, Dict[int, float]] = {}
+        for end_index, targets in self._keyword_automaton.iter(text):
+            pending = [(category, priority) for category, priority in targets
+                       if priority not in hits.get(category, ())]
+            if not pending:
+                continue
+            # 关键词不含分隔符，命中位置必然落在同一个句子内
+            value = self._sentence_value(text, boundaries, bisect_left(boundaries, end_index), cache)
+            if value is None:
+                continue
+            for category, priority in pending:
+                hits.setdefault(category, {})[priority] = value
+
+        return {category: found[min(found)] for category, found in hits.items()}
+
+    def _find_keyword_value(self, text: str, keywords: List[str], boundaries: List[int],
+                            cache: Dict[int, Optional[float]]) -> Optional[float]:
+        """按关键词顺序查找第一个包含该关键词且含数字的句子，并返回其中最后一个数值"""
         for keyword in keywords:
-            # 查找包含关键词的句子
-            sentences = re.split(r'[。.!?\n]', text)
-            for sentence in sentences:
-                if keyword in sentence:
-                    # 尝试提取数字
-                    numbers = re.findall(
-                        r'\d+(?:\.\d+)?(?:[万亿万千百]?)', sentence)
-                    if numbers:
-                        # 处理中国数字单位（万亿、亿、万）
-                        return self._parse_chinese_number(numbers[-1])
+            position = text.find(keyword)
+            while position != -1:
+                index = bisect_left(boundaries, position)
+                value = self._sentence_value(text, boundaries, index, cache)
+                if value is not None:
+                    return value
+                if index >= len(boundaries):
+                    break
+                # 当前句子没有数字，直接跳到下一个句子继续查找
+                position = text.find(keyword, boundaries[index] + 1)
         return None
 
+    def _extract_value_by_keywords(self, text: str, keywords: List[str]) -> Optional[float]:
+        """根据关键词从文本中提取数值"""
+        return self._find_keyword_value(text, keywords, self._sentence_boundaries(text), {})
+
     def _parse_chinese_number(self, num_str: str) -> float:
         """解析包含中文单位的数字"""
-        multipliers = {
-            '万': 10000,
-            '亿': 100000000,
-            '万亿': 1000000000000,
-        }
-
-        # 提取数字部分和单位部分
-        match = re.match(r'(\d+(?:\.\d+)?)\s*([万亿万千百]*)', num_str)
-        if match:
-            num_part, unit_part = match.groups()
-            num = float(num_part)
-
-            # 应用单位乘数
-            for unit, multiplier in multipliers.items():
-                if unit in unit_part:
-                    num *= multiplier
-
-            return num
-
-        return float(num_str) if num_str.isdigit() else 0
+        return _parse_number_token(num_str)
 
     def _extract_year(self, text: str) -> Optional[int]:
         """从文本中提取年份"""
-        year_match = re.search(r'20\d{2}', text)
+        year_match = _YEAR_RE.search(text)
         if year_match:
             return int(year_match.group())
         return None
 
     def _extract_quarter(self, text: str) -> Optional[int]:
         """从文本中提取季度"""
-        quarter_match = re.search(r'(第)?([一二三四1234])[季度Qq]', text)
+        quarter_match = _QUARTER_RE.search(text)
         if quarter_match:
             quarter_map = {'一': 1, '二': 2, '三': 3, '四': 4}
             q_str = quarter_match.group(2)
@@ -433,26 +642,50 @@ class FinancialAnalyzer:
                 return int(q_str)
         return None
 
-    def _get_metric_display_name(self, metric_name: str) -> str:
+    @staticmethod
+    def _get_metric_display_name(metric_name: str) -> str:
         """获取指标的显示名称"""
-        display_names = {
-            'profit_margin': '利润率',
-            'return_on_assets': '资产回报率',
-            'debt_to_equity': '债务权益比',
-            'current_ratio': '流动比率',
-            'revenue_growth': '收入增长率',
-            'profit_growth': '利润增长率',
-        }
-        return display_names.get(metric_name, metric_name)
-
-    def _format_metric_value(self, metric_name: str, value: float) -> str:
-        """格式化指标值"""
-        # 对于比率类指标，显示为百分比
-        if metric_name in ['profit_margin', 'return_on_assets', 'revenue_growth', 'profit_growth']:
-            return f"{value:.2%}"
-        # 对于其他指标，保留两位小数
-        else:
-            return f"{value:.2f}"
+        return _METRIC_DISPLAY_NAMES.get(metric_name, metric_name)
+
+    @staticmethod
+    def _format_metric_value(metric_name: str, value: float) -> str:
+        """格式化指标值：比率类指标显示为百分比，其他指标保留两位小数"""
+        return f"{value:.2%}" if metric_name in _PERCENT_METRICS else f"{value:.2f}"
+
+
+def _build_automaton(table_key: tuple):
+    """根据 ((类别, 关键词元组), ...) 构建多模式匹配自动机，命中值为 ((类别, 关键词序号), ...)"""
+    # 同一关键词可能属于多个类别，先汇总再写入自动机
+    entries = {}
+    for category, keywords in table_key:
+        for priority, keyword in enumerate(keywords):
+            entries.setdefault(keyword, []).append((category, priority))
+
+    automaton = ahocorasick.Automaton()
+    for keyword, targets in entries.items():
+        automaton.add_word(keyword, tuple(targets))
+    automaton.make_automaton()
+    return automaton
+
+
+@lru_cache(maxsize=PARSED_NUMBER_CACHE_SIZE)
+def _parse_number_token(num_str: str) -> float:
+    """解析包含中文单位的数字，结果按原始字符串缓存"""
+    # 提取数字部分和单位部分
+    match = _CN_NUM_RE.match(num_str)
+    if match:
+        num_part, unit_part = match.groups()
+        num = float(num_part)
+
+        # 应用单位乘数
+        if unit_part:
+            for unit, multiplier in _UNIT_MULTIPLIERS.items():
+                if unit in unit_part:
+                    num *= multiplier
+
+        return num
+
+    return float(num_str) if num_str.isdigit() else 0
 
 
 # 创建全局实例供外部使用
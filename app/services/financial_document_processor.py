@@ -5,12 +5,35 @@
 import os
 import json
 import logging
+import multiprocessing
+import threading
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from concurrent.futures.process import BrokenProcessPool
 from typing import Dict, List, Any, Optional, Tuple
 from datetime import datetime
 
+from app.services.financial_file_parser import process_financial_file as _process_financial_file
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
 # 配置日志
 logger = logging.getLogger(__name__)
 
+# 构建知识库时并行解析文档的最大进程数，PDF/Word解析以CPU为主，适合多进程
+MAX_PROCESS_WORKERS = os.cpu_count() or 1
+
+# 解析文档的子进程优先以 forkserver 方式启动：服务进程中有后台线程，直接 fork 可能继承已被持有的锁而死锁
+# 不支持 forkserver 的平台（如Windows）使用平台默认的启动方式
+PROCESS_POOL_START_METHOD = "forkserver"
+
+# 进程池在多次构建之间复用，首次需要时创建，子进程异常退出后重建
+_process_pool: Optional[ProcessPoolExecutor] = None
+_process_pool_lock = threading.Lock()
+
+
 class FinancialDocumentProcessor:
     """
     财务文档处理器，负责处理财务文档的上传、解析、分割和向量化
@@ -24,6 +47,8 @@ class FinancialDocumentProcessor:
         """
         self.knowledge_base_path = knowledge_base_path
         self.document_registry_path = os.path.join(self.knowledge_base_path, "document_registry.json")
+        # 注册表文件上次加载或保存时的修改时间，文件未变化时跳过重复解析
+        self._registry_mtime = None
         self.document_registry = self._load_document_registry()
         
         # 确保知识库目录存在
@@ -33,31 +58,67 @@ class FinancialDocumentProcessor:
     
     def _load_document_registry(self) -> Dict[str, Dict[str, Any]]:
         """
-        加载文档注册表
+        加载文档注册表，文件自上次加载或保存后未变化时直接返回内存中的注册表
         
         返回：
         - 文档注册表字典
         """
-        if os.path.exists(self.document_registry_path):
-            try:
-                with open(self.document_registry_path, 'r', encoding='utf-8') as f:
-                    return json.load(f)
-            except Exception as e:
-                logger.error(f"加载文档注册表时出错: {str(e)}")
-                return {}
-        else:
+        cached = getattr(self, 'document_registry', None)
+        try:
+            mtime = os.stat(self.document_registry_path).st_mtime_ns
+        except FileNotFoundError:
+            self._registry_mtime = None
             return {}
+        except OSError as e:
+            logger.error(f"加载文档注册表时出错: {str(e)}")
+            return cached if cached is not None else {}
+        
+        if cached is not None and mtime == self._registry_mtime:
+            return cached
+        
+        try:
+            if orjson is not None:
+                with open(self.document_registry_path, 'rb') as f:
+                    registry = orjson.loads(f.read())
+            else:
+                with open(self.document_registry_path, 'r', encoding='utf-8') as f:
+                    registry = json.load(f)
+        except Exception as e:
+            logger.error(f"加载文档注册表时出错: {str(e)}")
+            # 读取失败时保留内存中已有的注册表
+            return cached if cached is not None else {}
+        
+        self._registry_mtime = mtime
+        return registry
+    
+    def _refresh_document_registry(self):
+        """
+        注册表文件被其他实例修改后重新加载
+        """
+        self.document_registry = self._load_document_registry()
     
     def _save_document_registry(self):
         """
         保存文档注册表
         """
+        # 先写临时文件再原子替换，避免写到一半时留下损坏的注册表
+        tmp_path = f"{self.document_registry_path}.{os.getpid()}.{threading.get_ident()}.tmp"
         try:
-            with open(self.document_registry_path, 'w', encoding='utf-8') as f:
-                json.dump(self.document_registry, f, ensure_ascii=False, indent=2)
+            if orjson is not None:
+                with open(tmp_path, 'wb') as f:
+                    f.write(orjson.dumps(self.document_registry,
+                                         option=orjson.OPT_INDENT_2 | orjson.OPT_NON_STR_KEYS))
+            else:
+                # 与orjson输出相同的两空格缩进格式，文件格式不随可选依赖变化
+                with open(tmp_path, 'w', encoding='utf-8') as f:
+                    json.dump(self.document_registry, f, ensure_ascii=False, indent=2)
+            os.replace(tmp_path, self.document_registry_path)
+            self._registry_mtime = os.stat(self.document_registry_path).st_mtime_ns
             logger.info("文档注册表保存成功")
         except Exception as e:
             logger.error(f"保存文档注册表时出错: {str(e)}")
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
     
     def build_company_knowledge_base(self, company_name: str, documents: List[Dict[str, Any]]) -> Dict[str, Any]:
         """
@@ -72,59 +133,13 @@ class FinancialDocumentProcessor:
         """
         try:
             logger.info(f"开始为公司 {company_name} 构建财务知识库")
+            company_path = self._prepare_company_knowledge_base(company_name)
+            valid_docs = self._collect_valid_documents(documents)
             
-            # 创建公司特定的知识库路径
-            company_path = os.path.join(self.knowledge_base_path, company_name.replace(' ', '_'))
-            if not os.path.exists(company_path):
-                os.makedirs(company_path)
-            
-            # 初始化公司文档信息
-            if company_name not in self.document_registry:
-                self.document_registry[company_name] = {
-                    'documents': {},
-                    'created_at': datetime.now().isoformat(),
-                    'updated_at': datetime.now().isoformat()
-                }
-            
-            # 处理每个文档
-            processed_docs = []
-            for doc in documents:
-                file_path = doc.get('file_path')
-                file_name = doc.get('file_name')
-                
-                if not file_path or not file_name:
-                    logger.warning("文档缺少必要的路径或文件名信息")
-                    continue
-                
-                # 处理财务文件
-                result = self.process_financial_file(file_path, file_name)
-                if 'error' in result:
-                    logger.error(f"处理文件 {file_name} 失败: {result['error']}")
-                    continue
-                
-                # 保存处理后的文档信息
-                doc_info = {
-                    'file_name': file_name,
-                    'original_path': file_path,
-                    'processed_at': datetime.now().isoformat()
-                }
-                
-                self.document_registry[company_name]['documents'][file_name] = doc_info
-                processed_docs.append(file_name)
-            
-            # 更新注册表
-            self.document_registry[company_name]['updated_at'] = datetime.now().isoformat()
-            self._save_document_registry()
+            # 并行处理财务文件，注册表只在主进程中按原顺序更新
+            results = self._process_files_parallel(valid_docs)
             
-            logger.info(f"公司 {company_name} 的财务知识库构建完成，成功处理 {len(processed_docs)} 个文档")
-            
-            return {
-                'status': 'success',
-                'message': f'为公司 {company_name} 成功构建财务知识库',
-                'processed_documents': processed_docs,
-                'total_documents': len(processed_docs),
-                'knowledge_base_path': company_path
-            }
+            return self._record_processed_documents(company_name, company_path, valid_docs, results)
             
         except Exception as e:
             logger.error(f"为公司 {company_name} 构建财务知识库时出错: {str(e)}")
@@ -133,6 +148,98 @@ class FinancialDocumentProcessor:
                 'message': f'构建财务知识库失败: {str(e)}'
             }
     
+    def _prepare_company_knowledge_base(self, company_name: str) -> str:
+        """
+        创建公司知识库目录并在注册表中初始化公司信息
+        
+        参数：
+        - company_name: 公司名称
+        
+        返回：
+        - 公司知识库路径
+        """
+        self._refresh_document_registry()
+        
+        # 创建公司特定的知识库路径
+        company_path = os.path.join(self.knowledge_base_path, company_name.replace(' ', '_'))
+        if not os.path.exists(company_path):
+            os.makedirs(company_path)
+        
+        # 初始化公司文档信息
+        if company_name not in self.document_registry:
+            self.document_registry[company_name] = {
+                'documents': {},
+                'created_at': datetime.now().isoformat(),
+                'updated_at': datetime.now().isoformat()
+            }
+        return company_path
+    
+    @staticmethod
+    def _collect_valid_documents(documents: List[Dict[str, Any]]) -> List[Tuple[str, str]]:
+        """
+        筛选包含路径和文件名的文档
+        
+        参数：
+        - documents: 文档列表
+        
+        返回：
+        - (文件路径, 文件名) 列表
+        """
+        valid_docs = []
+        for doc in documents:
+            file_path = doc.get('file_path')
+            file_name = doc.get('file_name')
+            
+            if not file_path or not file_name:
+                logger.warning("文档缺少必要的路径或文件名信息")
+                continue
+            valid_docs.append((file_path, file_name))
+        return valid_docs
+    
+    def _record_processed_documents(self, company_name: str, company_path: str,
+                                    valid_docs: List[Tuple[str, str]], results: List[Dict[str, Any]]) -> Dict[str, Any]:
+        """
+        将处理成功的文档写入注册表并保存
+        
+        参数：
+        - company_name: 公司名称
+        - company_path: 公司知识库路径
+        - valid_docs: (文件路径, 文件名) 列表
+        - results: 与 valid_docs 顺序一致的处理结果
+        
+        返回：
+        - 包含构建结果和统计信息的字典
+        """
+        processed_docs = []
+        for (file_path, file_name), result in zip(valid_docs, results):
+            if 'error' in result:
+                logger.error(f"处理文件 {file_name} 失败: {result['error']}")
+                continue
+            
+            # 保存处理后的文档信息
+            doc_info = {
+                'file_name': file_name,
+                'original_path': file_path,
+                'processed_at': datetime.now().isoformat()
+            }
+            
+            self.document_registry[company_name]['documents'][file_name] = doc_info
+            processed_docs.append(file_name)
+        
+        # 更新注册表
+        self.document_registry[company_name]['updated_at'] = datetime.now().isoformat()
+        self._save_document_registry()
+        
+        logger.info(f"公司 {company_name} 的财务知识库构建完成，成功处理 {len(processed_docs)} 个文档")
+        
+        return {
+            'status': 'success',
+            'message': f'为公司 {company_name} 成功构建财务知识库',
+            'processed_documents': processed_docs,
+            'total_documents': len(processed_docs),
+            'knowledge_base_path': company_path
+        }
+    
     def query_company_knowledge(self, company_name: str, query: str, top_k: int = 5) -> List[Dict[str, Any]]:
         """
         查询公司的财务知识库
@@ -146,6 +253,7 @@ class FinancialDocumentProcessor:
         - 查询结果列表
         """
         try:
+            self._refresh_document_registry()
             if company_name not in self.document_registry:
                 logger.warning(f"公司 {company_name} 的财务知识库不存在")
                 return []
@@ -185,6 +293,7 @@ class FinancialDocumentProcessor:
         返回：
         - 公司名称列表
         """
+        self._refresh_document_registry()
         return list(self.document_registry.keys())
     
     def get_company_documents(self, company_name: str) -> Dict[str, Dict[str, Any]]:
@@ -197,6 +306,7 @@ class FinancialDocumentProcessor:
         返回：
         - 文档信息字典
         """
+        self._refresh_document_registry()
         if company_name not in self.document_registry:
             return {}
         
@@ -213,6 +323,7 @@ class FinancialDocumentProcessor:
         - 操作是否成功
         """
         try:
+            self._refresh_document_registry()
             if company_name not in self.document_registry:
                 return False
             
@@ -232,6 +343,39 @@ class FinancialDocumentProcessor:
             logger.error(f"删除公司 {company_name} 财务知识库时出错: {str(e)}")
             return False
     
+    def _process_files_parallel(self, files: List[Tuple[str, str]]) -> List[Dict[str, Any]]:
+        """
+        使用进程池并行处理多个财务文件
+        
+        参数：
+        - files: (文件路径, 文件名) 列表
+        
+        返回：
+        - 与输入顺序一致的处理结果列表
+        """
+        max_workers = min(MAX_PROCESS_WORKERS, len(files))
+        if max_workers <= 1:
+            return [_process_financial_file(file_path, file_name) for file_path, file_name in files]
+        
+        results: List[Optional[Dict[str, Any]]] = [None] * len(files)
+        executor = None
+        try:
+            executor = _get_process_pool()
+            futures = {
+                executor.submit(_process_financial_file, file_path, file_name): index
+                for index, (file_path, file_name) in enumerate(files)
+            }
+            for future in as_completed(futures):
+                results[futures[future]] = future.result()
+        except (OSError, ValueError, BrokenProcessPool) as e:
+            # 无法创建子进程（包括平台不支持的启动方式）或子进程异常退出时，丢弃该进程池，退回到当前进程中处理剩余文件
+            logger.warning(f"进程池处理文件失败，改为顺序处理: {str(e)}")
+            _discard_process_pool(executor)
+            for index, (file_path, file_name) in enumerate(files):
+                if results[index] is None:
+                    results[index] = _process_financial_file(file_path, file_name)
+        return results
+    
     def process_financial_file(self, file_path: str, file_name: str) -> Dict[str, Any]:
         """
         处理单个财务文件并提取内容
@@ -243,86 +387,42 @@ class FinancialDocumentProcessor:
         返回：
         - 包含文件名和内容的字典
         """
-        try:
-            logger.info(f"开始处理文件: {file_name} ({file_path})")
-            
-            # 根据文件扩展名处理不同类型的文件
-            file_ext = os.path.splitext(file_name)[1].lower()
-            content = ""
-            
-            if file_ext in [".txt", ".md"]:
-                # 文本文件
-                with open(file_path, 'r', encoding='utf-8', errors='ignore') as f:
-                    content = f.read()
-            
-            elif file_ext == ".pdf":
-                # PDF文件 - 尝试导入PyPDF2进行处理
-                try:
-                    import PyPDF2
-                    with open(file_path, 'rb') as f:
-                        reader = PyPDF2.PdfReader(f)
-                        content = ""
-                        for page in reader.pages:
-                            content += page.extract_text() or ""
-                except ImportError:
-                    logger.warning("PyPDF2未安装，无法处理PDF文件")
-                    return {
-                        'file_name': file_name,
-                        'content': "",
-                        'error': "PDF处理模块未安装"
-                    }
-                except Exception as e:
-                    logger.error(f"处理PDF文件时出错: {str(e)}")
-                    return {
-                        'file_name': file_name,
-                        'content': "",
-                        'error': f"PDF处理错误: {str(e)}"
-                    }
-            
-            elif file_ext in [".docx", ".doc"]:
-                # Word文件 - 尝试导入python-docx进行处理
-                try:
-                    import docx
-                    doc = docx.Document(file_path)
-                    content = "\n".join([para.text for para in doc.paragraphs])
-                except ImportError:
-                    logger.warning("python-docx未安装，无法处理Word文件")
-                    return {
-                        'file_name': file_name,
-                        'content': "",
-                        'error': "Word处理模块未安装"
-                    }
-                except Exception as e:
-                    logger.error(f"处理Word文件时出错: {str(e)}")
-                    return {
-                        'file_name': file_name,
-                        'content': "",
-                        'error': f"Word处理错误: {str(e)}"
-                    }
-            
+        return _process_financial_file(file_path, file_name)
+
+
+def _get_process_pool() -> ProcessPoolExecutor:
+    """
+    获取共享的文档解析进程池，首次调用时创建
+    
+    返回：
+    - 进程池，支持时以 forkserver 方式启动子进程
+    """
+    global _process_pool
+    with _process_pool_lock:
+        if _process_pool is None:
+            if PROCESS_POOL_START_METHOD in multiprocessing.get_all_start_methods():
+                mp_context = multiprocessing.get_context(PROCESS_POOL_START_METHOD)
             else:
-                logger.warning(f"不支持的文件格式: {file_ext}")
-                # 尝试作为文本文件读取
-                try:
-                    with open(file_path, 'r', encoding='utf-8', errors='ignore') as f:
-                        content = f.read()
-                except:
-                    content = ""
-            
-            logger.info(f"文件 {file_name} 处理完成，内容长度: {len(content)} 字符")
-            
-            return {
-                'file_name': file_name,
-                'content': content
-            }
-            
-        except Exception as e:
-            logger.error(f"处理文件 {file_name} 时出错: {str(e)}")
-            return {
-                'file_name': file_name,
-                'content': "",
-                'error': str(e)
-            }
+                mp_context = multiprocessing.get_context()
+            _process_pool = ProcessPoolExecutor(max_workers=MAX_PROCESS_WORKERS, mp_context=mp_context)
+        return _process_pool
+
+
+def _discard_process_pool(executor: Optional[ProcessPoolExecutor]):
+    """
+    丢弃已损坏的进程池，下次使用时重新创建
+    
+    参数：
+    - executor: 出错的进程池，为None时不做处理
+    """
+    global _process_pool
+    if executor is None:
+        return
+    with _process_pool_lock:
+        if _process_pool is executor:
+            _process_pool = None
+    executor.shutdown(wait=False, cancel_futures=True)
+
 
 # 创建全局实例供外部使用
 financial_document_processor = FinancialDocumentProcessor()
\ No newline at end of file
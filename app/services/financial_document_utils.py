@@ -1,19 +1,224 @@
 from typing import List, Dict, Any, Optional, Tuple
 import re
+import functools
+import hashlib
+import threading
+from collections import OrderedDict
 from datetime import datetime
 import os
-import nltk
-from nltk.tokenize import sent_tokenize
 import logging
 from app.chunk.splitter import FinancialTextSplitter
 
 logger = logging.getLogger(__name__)
 
-# 尝试下载NLTK资源
+# 标签生成结果缓存的最大条目数，同一文档的文本往往被多次打标签和提取元数据
+TAG_CACHE_SIZE = 512
+
+# 可选依赖：pyahocorasick 多模式匹配自动机，未安装时回退到逐关键词子串查找
 try:
-    nltk.download('punkt', quiet=True)
-except:
-    logger.warning("无法下载NLTK资源punkt")
+    import ahocorasick
+except ImportError:
+    ahocorasick = None
+
+# 章节标题模式的统一前缀，去掉后可以合并成在整篇文本上按行首扫描的正则
+_SECTION_PATTERN_PREFIX = r'^\s*'
+
+# 单行（不含换行符）及其后的换行符
+_LINE_RE = re.compile(r'([^\n]*)\n?')
+
+# 句子结束符（中英文句号、问号、感叹号）；两侧都是数字的小数点（如 10.5）直接在正则中排除
+_SENTENCE_END_RE = re.compile(r'[。!！?？]|(?<!\d)\.|\.(?!\d)')
+
+# 表格检测：连续数字和典型的表格分隔符
+_NUMERIC_TABLE_RE = re.compile(r'\d+\s+\d+')
+_TABLE_MARKER_MIN_RUN = 20
+_TABLE_MARKER_RE = re.compile(r'[-\+\|\s]{%d,}' % _TABLE_MARKER_MIN_RUN)
+
+# 2000-2099年间的年份
+_YEAR_RE = re.compile(r'\b(20[0-9]{2})\b')
+
+# 季度模式及对应的季度值（字符串或根据匹配结果生成季度值的函数）
+_QUARTER_PATTERNS = [
+    # 用匹配结果展开季度编号；直接返回 r'Q\1' 会得到字面量而非 Q1~Q4
+    (re.compile(r'\bQ([1-4])\b', re.IGNORECASE), lambda m: m.expand(r'Q\1')),  # Q1, Q2, Q3, Q4
+    (re.compile(r'\b第([一二三四])季度\b', re.IGNORECASE),
+     lambda m: f"Q{m.group(1).translate(str.maketrans('一二三四', '1234'))}"),
+    (re.compile(r'\b第一季度\b', re.IGNORECASE), 'Q1'),
+    (re.compile(r'\b第二季度\b', re.IGNORECASE), 'Q2'),
+    (re.compile(r'\b第三季度\b', re.IGNORECASE), 'Q3'),
+    (re.compile(r'\b第四季度\b', re.IGNORECASE), 'Q4'),
+    (re.compile(r'\b一季度\b', re.IGNORECASE), 'Q1'),
+    (re.compile(r'\b二季度\b', re.IGNORECASE), 'Q2'),
+    (re.compile(r'\b三季度\b', re.IGNORECASE), 'Q3'),
+    (re.compile(r'\b四季度\b', re.IGNORECASE), 'Q4'),
+]
+
+# 财务金额，例如 $100,000, 100万元, 1,000.00
+_AMOUNT_RES = [
+    re.compile(r'\$?\d{1,3}(,\d{3})*(\.\d{1,2})?\s*(million|billion|trillion|万|亿)?', re.IGNORECASE),
+    re.compile(r'\d+(\.\d+)?\s*(元|美元|欧元|英镑)', re.IGNORECASE),
+]
+
+# 百分比
+_PERCENTAGE_RE = re.compile(r'\d+(\.\d+)?\s*%')
+
+# 时间参考（在小写文本上匹配）
+_TIME_RES = [
+    re.compile(r'\b(\d{1,2})[-/](\d{1,2})[-/](\d{2,4})\b'),  # 日期格式
+    re.compile(r'\b(\d{4})[-/](\d{1,2})[-/](\d{1,2})\b'),
+    re.compile(r'\b(january|february|march|april|may|june|july|august|september|october|november|december)\b'),
+    re.compile(r'\b(一月|二月|三月|四月|五月|六月|七月|八月|九月|十月|十一月|十二月)\b'),
+    re.compile(r'\bQ[1-4]\b'),  # 季度
+    re.compile(r'\b(第一|第二|第三|第四)季度\b'),
+]
+
+
+# 内容特征标签及其对应的正则，合并为一个带命名分组的正则在小写文本上扫描
+# 金额与百分比只涉及数字、空白和符号，在小写文本上的命中结果与原文一致
+_CONTENT_FEATURE_RES = {
+    'financial_amounts': _AMOUNT_RES,
+    'percentages': [_PERCENTAGE_RE],
+    'time_references': _TIME_RES,
+}
+
+
+def _scoped_pattern(pattern: re.Pattern) -> str:
+    """将已编译正则的大小写标志收进分组内，以便与其他正则合并"""
+    if pattern.flags & re.IGNORECASE:
+        return f"(?i:{pattern.pattern})"
+    return f"(?:{pattern.pattern})"
+
+
+@functools.lru_cache(maxsize=None)
+def _content_feature_re(features: Tuple[str, ...]) -> re.Pattern:
+    """
+    构建只包含指定特征的合并正则，每个特征对应一个同名的命名分组
+    
+    Args:
+        features: 特征标签元组
+        
+    Returns:
+        编译后的合并正则
+    """
+    return re.compile("|".join(
+        f"(?P<{feature}>{'|'.join(_scoped_pattern(p) for p in _CONTENT_FEATURE_RES[feature])})"
+        for feature in features
+    ))
+
+
+def _scan_content_features(text_lower: str) -> set:
+    """
+    扫描文本中出现的内容特征（金额、百分比、时间参考）
+    
+    每次查找剩余特征中最靠前的匹配；在该位置之前其余特征都不可能匹配，
+    因此去掉已命中的特征后从同一位置继续查找，最多查找特征数次
+    
+    Args:
+        text_lower: 小写的文本内容
+        
+    Returns:
+        命中的特征标签集合
+    """
+    found = set()
+    remaining = tuple(_CONTENT_FEATURE_RES)
+    pos = 0
+    while remaining:
+        match = _content_feature_re(remaining).search(text_lower, pos)
+        if match is None:
+            break
+        found.add(match.lastgroup)
+        remaining = tuple(feature for feature in remaining if feature != match.lastgroup)
+        pos = match.start()
+    return found
+
+def _joins_numeric_table(left: str, right: str) -> bool:
+    """
+    判断用空格拼接两个文本块后，拼接处是否新形成连续数字匹配
+    
+    Args:
+        left: 前一个文本块
+        right: 后一个文本块
+        
+    Returns:
+        拼接处是否出现"数字 空白 数字"
+    """
+    left = left.rstrip()
+    right = right.lstrip()
+    return bool(left) and bool(right) and left[-1].isdecimal() and right[0].isdecimal()
+
+
+def _joins_table_marker(left: str, right: str) -> bool:
+    """
+    判断用空格拼接两个不含表格标记的文本块后，拼接处是否新形成表格标记
+    
+    两侧都不含表格标记时，各自首尾的分隔符长度都小于阈值，只需检查拼接处的窗口
+    
+    Args:
+        left: 前一个文本块
+        right: 后一个文本块
+        
+    Returns:
+        拼接处是否出现足够长的表格分隔符
+    """
+    window = left[-_TABLE_MARKER_MIN_RUN:] + " " + right[:_TABLE_MARKER_MIN_RUN]
+    return bool(_TABLE_MARKER_RE.search(window))
+
+
+def _joined_tail(parts: List[str]) -> str:
+    """
+    取片段列表用空格拼接后的末尾部分，足以判断拼接处是否形成新的表格特征
+    
+    末尾部分至少包含 _TABLE_MARKER_MIN_RUN 个字符和一个非空白字符（若存在），
+    因此其末尾窗口和去除尾部空白后的最后一个字符都与完整拼接结果一致
+    
+    Args:
+        parts: 待拼接的文本片段
+        
+    Returns:
+        拼接结果的末尾部分
+    """
+    length = 0
+    has_content = False
+    start = len(parts)
+    while start > 0 and (length < _TABLE_MARKER_MIN_RUN or not has_content):
+        start -= 1
+        length += len(parts[start]) + 1
+        if parts[start] and not parts[start].isspace():
+            has_content = True
+    return " ".join(parts[start:])
+
+def _text_fingerprint(text: str) -> bytes:
+    """计算文本指纹，用作缓存键，缓存中不保留原文"""
+    return hashlib.blake2b(text.encode('utf-8', 'surrogatepass'), digest_size=16).digest()
+
+
+def _memoize_by_text(method):
+    """
+    按 (方法名, 文本指纹, 其余参数) 缓存 FinancialTagGenerator 方法的结果
+    列表结果以元组缓存，每次返回新的列表，调用方修改返回值不影响缓存
+    下划线开头的关键字参数（如预先计算的小写文本）只是计算辅助，不参与缓存键
+    """
+    @functools.wraps(method)
+    def wrapper(self, text, *args, **kwargs):
+        if not isinstance(text, str):
+            return method(self, text, *args, **kwargs)
+        
+        key = (method.__name__, _text_fingerprint(text), args,
+               tuple(sorted(item for item in kwargs.items() if not item[0].startswith('_'))))
+        with self._result_cache_lock:
+            if key in self._result_cache:
+                self._result_cache.move_to_end(key)
+                cached = self._result_cache[key]
+                return list(cached) if isinstance(cached, tuple) else cached
+        
+        result = method(self, text, *args, **kwargs)
+        with self._result_cache_lock:
+            self._result_cache[key] = tuple(result) if isinstance(result, list) else result
+            while len(self._result_cache) > TAG_CACHE_SIZE:
+                self._result_cache.popitem(last=False)
+        return result
+    
+    return wrapper
 
 
 class EnhancedFinancialTextSplitter(FinancialTextSplitter):
@@ -70,6 +275,25 @@ class EnhancedFinancialTextSplitter(FinancialTextSplitter):
         
         # 财务数字模式，用于避免在财务数据中间分割
         self.financial_number_pattern = r'\d+(?:,\d{3})*(?:\.\d+)?\s*[%$￥]?'
+        
+        # 所有章节标题模式合并为一个预编译的正则，每行只需匹配一次
+        self._section_union_re = re.compile("|".join(f"(?:{p})" for p in self.financial_section_patterns))
+        self._section_scan_re = self._build_section_scan_re()
+    
+    def _build_section_scan_re(self) -> Optional[re.Pattern]:
+        """
+        将章节标题模式合并为在整篇文本上按行首扫描的多行正则
+        
+        返回：
+        - 编译后的正则；存在不以统一前缀开头的模式时返回 None，改为逐行匹配
+        """
+        bodies = []
+        for pattern in self.financial_section_patterns:
+            if not pattern.startswith(_SECTION_PATTERN_PREFIX):
+                return None
+            bodies.append(pattern[len(_SECTION_PATTERN_PREFIX):])
+        # 行首空白不跨行，与逐行 strip 后再匹配的语义保持一致
+        return re.compile(r'^[^\S\n]*(?:' + "|".join(f"(?:{body})" for body in bodies) + ')', re.MULTILINE)
     
     def _identify_financial_sections(self, text: str) -> List[Tuple[int, int, str]]:
         """
@@ -81,37 +305,80 @@ class EnhancedFinancialTextSplitter(FinancialTextSplitter):
         返回：
         - 章节列表，每个元素包含(开始位置, 结束位置, 章节标题)
         """
+        if self._section_scan_re is None:
+            return self._identify_financial_sections_by_line(text)
+        
         sections = []
-        lines = text.split('\n')
         section_start = 0
         current_title = ""
-        text_pos = 0
-        
-        for i, line in enumerate(lines):
-            line_len = len(line) + 1  # +1 for the newline character
+        text_len = len(text)
+        pos = 0
+        
+        # 直接在原文上查找候选标题行，不拆分行也不累计偏移量
+        while pos <= text_len:
+            match = self._section_scan_re.search(text, pos)
+            if match is None:
+                break
             
-            # 检查是否匹配财务章节标题模式
-            matched = False
-            for pattern in self.financial_section_patterns:
-                if re.match(pattern, line.strip()):
-                    # 保存前一个章节(如果有的话)
-                    if current_title:
-                        sections.append((section_start, text_pos, current_title))
-                    
-                    # 开始新章节
-                    current_title = line.strip()
-                    section_start = text_pos
-                    matched = True
-                    break
+            line_start = match.start()
+            line_end = text.find('\n', line_start)
+            if line_end == -1:
+                line_end = text_len
             
-            if matched:
+            # 候选行按原有规则（去除首尾空白后匹配）确认
+            stripped = text[line_start:line_end].strip()
+            if self._section_union_re.match(stripped):
+                # 保存前一个章节(如果有的话)
+                if current_title:
+                    sections.append((section_start, line_start, current_title))
+                
+                # 开始新章节
+                current_title = stripped
+                section_start = line_start
                 logger.debug(f"识别到财务章节: {current_title}")
             
-            text_pos += line_len
+            # 从下一行开始继续查找，每行最多确认一次
+            pos = line_end + 1
+        
+        # 添加最后一个章节（结束位置与逐行累计的偏移量一致，为文本长度加最后一行的换行符）
+        if current_title:
+            sections.append((section_start, text_len + 1, current_title))
+        
+        return sections
+    
+    def _identify_financial_sections_by_line(self, text: str) -> List[Tuple[int, int, str]]:
+        """
+        逐行匹配章节标题，用于无法合并为多行正则的自定义模式
+        
+        参数：
+        - text: 完整文本
+        
+        返回：
+        - 章节列表，每个元素包含(开始位置, 结束位置, 章节标题)
+        """
+        sections = []
+        section_start = 0
+        current_title = ""
+        
+        # 逐行流式遍历，不生成整篇文本的行列表，行首偏移量直接取自匹配位置
+        for line_match in _LINE_RE.finditer(text):
+            line_start = line_match.start()
+            
+            # 检查是否匹配财务章节标题模式
+            stripped = line_match.group(1).strip()
+            if stripped and self._section_union_re.match(stripped):
+                # 保存前一个章节(如果有的话)
+                if current_title:
+                    sections.append((section_start, line_start, current_title))
+                
+                # 开始新章节
+                current_title = stripped
+                section_start = line_start
+                logger.debug(f"识别到财务章节: {current_title}")
         
-        # 添加最后一个章节
+        # 添加最后一个章节（结束位置为文本长度加最后一行的换行符）
         if current_title:
-            sections.append((section_start, text_pos, current_title))
+            sections.append((section_start, len(text) + 1, current_title))
         
         return sections
     
@@ -132,18 +399,20 @@ class EnhancedFinancialTextSplitter(FinancialTextSplitter):
         
         # 查找合适的分割位置
         # 优先考虑句号、问号、感叹号等句子结束符
-        end_markers = ['.', '。', '!', '！', '?', '？']
         split_pos = target_length
         
-        # 在目标长度附近寻找句子结束符
-        lookahead_window = min(100, len(text) - target_length)
-        for i in range(target_length, target_length + lookahead_window):
-            if i < len(text) and text[i] in end_markers:
-                # 确保不是在财务数字中间，例如："10.5%的增长率"
-                if not (text[i] == '.' and i > 0 and i < len(text) - 1 and 
-                        text[i-1].isdigit() and text[i+1].isdigit()):
-                    split_pos = i + 1  # 包含结束符
-                    break
+        # 在目标长度附近寻找句子结束符，由正则在窗口内直接定位候选位置
+        window_end = target_length + min(100, len(text) - target_length)
+        match = _SENTENCE_END_RE.search(text, target_length, window_end)
+        while match:
+            i = match.start()
+            # 确保不是在财务数字中间，例如："10.5%的增长率"
+            # 正则已排除十进制数字之间的小数点，这里只复核窗口边界和其他数字字符（如上标）
+            if not (text[i] == '.' and i > 0 and i < len(text) - 1 and
+                    text[i-1].isdigit() and text[i+1].isdigit()):
+                split_pos = i + 1  # 包含结束符
+                break
+            match = _SENTENCE_END_RE.search(text, i + 1, window_end)
         
         # 如果没找到合适的句子结束符，退回到普通分割
         return text[:split_pos], text[split_pos:]
@@ -161,36 +430,63 @@ class EnhancedFinancialTextSplitter(FinancialTextSplitter):
         if not chunks or len(chunks) < 2:
             return chunks
         
-        processed_chunks = [chunks[0]]
-        i = 1
+        # 每个块的表格特征只计算一次：检查是否包含多个连续数字和典型的表格标记
+        num_flags = [bool(_NUMERIC_TABLE_RE.search(chunk)) for chunk in chunks]
+        marker_flags = [bool(_TABLE_MARKER_RE.search(chunk)) for chunk in chunks]
+        max_merged_len = self.chunk_size * 1.5
         
-        while i < len(chunks):
+        # 合并的文本块先以片段列表暂存，最后统一 join，避免反复拼接长字符串
+        merged_parts = [[chunks[0]]]
+        prev_len = len(chunks[0])
+        prev_has_numerical_data = num_flags[0]
+        prev_has_table_markers = marker_flags[0]
+        
+        for i in range(1, len(chunks)):
             current_chunk = chunks[i]
-            prev_chunk = processed_chunks[-1]
-            
-            # 简单检测表格：检查是否包含多个连续数字和特定的表格分隔符
-            prev_has_numerical_data = bool(re.search(r'\d+\s+\d+', prev_chunk))
-            current_has_numerical_data = bool(re.search(r'\d+\s+\d+', current_chunk))
-            
-            # 检查是否包含典型的表格标记
-            prev_has_table_markers = bool(re.search(r'[-\+\|\s]{20,}', prev_chunk))
-            current_has_table_markers = bool(re.search(r'[-\+\|\s]{20,}', current_chunk))
+            current_has_numerical_data = num_flags[i]
+            current_has_table_markers = marker_flags[i]
             
             # 如果相邻块都包含表格特征，尝试合并它们
-            if (prev_has_numerical_data and current_has_numerical_data) or \
-               (prev_has_table_markers and current_has_table_markers):
-                # 合并前检查合并后的长度是否超过阈值
-                if len(prev_chunk) + len(current_chunk) < self.chunk_size * 1.5:
-                    processed_chunks[-1] = prev_chunk + " " + current_chunk
-                    logger.debug("检测到并合并了表格数据块")
+            if ((prev_has_numerical_data and current_has_numerical_data) or
+                    (prev_has_table_markers and current_has_table_markers)) and \
+                    prev_len + len(current_chunk) < max_merged_len:
+                prev_parts = merged_parts[-1]
+                # 合并块的特征由两侧特征推出，只需补查拼接处新形成的匹配
+                if not (prev_has_numerical_data or current_has_numerical_data):
+                    prev_has_numerical_data = _joins_numeric_table(_joined_tail(prev_parts), current_chunk)
                 else:
-                    processed_chunks.append(current_chunk)
+                    prev_has_numerical_data = True
+                if not (prev_has_table_markers or current_has_table_markers):
+                    prev_has_table_markers = _joins_table_marker(_joined_tail(prev_parts), current_chunk)
+                else:
+                    prev_has_table_markers = True
+                prev_parts.append(current_chunk)
+                prev_len += 1 + len(current_chunk)
+                logger.debug("检测到并合并了表格数据块")
             else:
-                processed_chunks.append(current_chunk)
-            
-            i += 1
+                merged_parts.append([current_chunk])
+                prev_len = len(current_chunk)
+                prev_has_numerical_data = current_has_numerical_data
+                prev_has_table_markers = current_has_table_markers
         
-        return processed_chunks
+        return [" ".join(parts) for parts in merged_parts]
+    
+    def _apply_smart_sentence_ending(self, chunk: str) -> str:
+        """
+        对单个文本块做句子结尾处理
+        
+        参数：
+        - chunk: 初步分割得到的文本块
+        
+        返回：
+        - 处理后的文本块
+        """
+        # 如果文本块以不完整的句子结尾，尝试调整
+        if not chunk.strip().endswith(('.', '。', '!', '！', '?', '？')) and len(chunk) > self.chunk_size * 0.8:
+            # 在保持块大小不变的情况下，尝试在句子结尾分割
+            smart_chunk, _ = self._smart_split_at_sentence(chunk, len(chunk))
+            return smart_chunk
+        return chunk
     
     def split_text(self, text: str) -> List[str]:
         """
@@ -205,24 +501,16 @@ class EnhancedFinancialTextSplitter(FinancialTextSplitter):
         # 1. 首先使用基础类的方法进行初步分割
         chunks = super().split_text(text)
         
-        # 2. 应用智能句子结尾处理
+        # 2. 应用智能句子结尾处理（各文本块互不依赖，逐块处理）
         if self.smart_sentence_ending and chunks:
-            processed_chunks = []
-            for chunk in chunks:
-                # 如果文本块以不完整的句子结尾，尝试调整
-                if not chunk.strip().endswith(('.', '。', '!', '！', '?', '？')) and len(chunk) > self.chunk_size * 0.8:
-                    # 在保持块大小不变的情况下，尝试在句子结尾分割
-                    smart_chunk, _ = self._smart_split_at_sentence(chunk, len(chunk))
-                    processed_chunks.append(smart_chunk)
-                else:
-                    processed_chunks.append(chunk)
-            chunks = processed_chunks
+            chunks = [self._apply_smart_sentence_ending(chunk) for chunk in chunks]
         
         # 3. 尝试保留财务表格完整性
         chunks = self._preserve_financial_tables(chunks)
         
-        # 4. 过滤空块和过短的块
-        chunks = [chunk.strip() for chunk in chunks if chunk.strip() and len(chunk.strip()) > 20]
+        # 4. 过滤空块和过短的块（每个块只 strip 一次）
+        stripped_chunks = (chunk.strip() for chunk in chunks)
+        chunks = [chunk for chunk in stripped_chunks if len(chunk) > 20]
         
         return chunks
 
@@ -276,7 +564,32 @@ class FinancialTagGenerator:
             'earnings_call': [r'earnings\s+call', r'财报电话会议'],
             'analyst_report': [r'analyst\s+report', r'分析师报告']
         }
+        
+        # 标签和元数据提取结果的LRU缓存，见 _memoize_by_text
+        self._result_cache = OrderedDict()
+        self._result_cache_lock = threading.Lock()
+        
+        # 小写关键词 -> 所属类别，所有类别的关键词一次扫描完成匹配
+        self._category_keywords = {
+            category: tuple(dict.fromkeys(keyword.lower() for keyword in keywords))
+            for category, keywords in self.financial_categories.items()
+        }
+        self._keyword_automaton = self._build_keyword_automaton()
+        
+        # 文档类型按定义顺序确定优先级，而不是按在文本中出现的位置
+        # 第 k 个正则合并前 k 种文档类型的模式，每种类型对应一个同名的命名分组
+        # 模式均为小写，且总是在小写文本上搜索，无需 IGNORECASE
+        self._document_types = tuple(self.document_type_patterns)
+        type_groups = [
+            f"(?P<{doc_type}>{'|'.join(f'(?:{p})' for p in patterns)})"
+            for doc_type, patterns in self.document_type_patterns.items()
+        ]
+        self._document_type_prefix_res = [None] + [
+            re.compile("|".join(type_groups[:count]))
+            for count in range(1, len(type_groups) + 1)
+        ]
     
+    @_memoize_by_text
     def generate_content_tags(self, text: str) -> List[str]:
         """
         基于文本内容生成财务标签
@@ -290,51 +603,116 @@ class FinancialTagGenerator:
         if not text or not isinstance(text, str):
             return []
         
-        tags = []
+        # 小写文本只计算一次，供关键词匹配和时间参考检查共用
         text_lower = text.lower()
         
-        # 检查每个财务类别
-        for category, keywords in self.financial_categories.items():
-            for keyword in keywords:
-                if keyword.lower() in text_lower:
-                    tags.append(category)
-                    break  # 每个类别只添加一次
+        # 检查每个财务类别，直接以集合累积标签，无需最后再去重
+        tags = set(self._match_keyword_categories(text_lower))
         
-        # 添加金额标签
-        if self._contains_financial_amounts(text):
-            tags.append('financial_amounts')
+        # 金额、百分比和时间参考标签由一次合并扫描得到
+        tags.update(_scan_content_features(text_lower))
         
-        # 添加百分比标签
-        if self._contains_percentages(text):
-            tags.append('percentages')
+        return list(tags)
+    
+    def _build_keyword_automaton(self):
+        """
+        构建包含全部小写关键词的 Aho-Corasick 自动机，未安装 pyahocorasick 时返回 None
+        
+        Returns:
+            命中值为所属类别元组的自动机
+        """
+        if ahocorasick is None:
+            return None
         
-        # 添加时间相关标签
-        if self._contains_time_references(text):
-            tags.append('time_references')
+        # 同一关键词可能属于多个类别，先汇总再写入自动机
+        keyword_categories = {}
+        for category, keywords in self._category_keywords.items():
+            for keyword in keywords:
+                keyword_categories.setdefault(keyword, []).append(category)
+        
+        automaton = ahocorasick.Automaton()
+        for keyword, categories in keyword_categories.items():
+            automaton.add_word(keyword, tuple(categories))
+        automaton.make_automaton()
+        return automaton
+    
+    def _match_keyword_categories(self, text_lower: str) -> List[str]:
+        """
+        找出文本中出现了关键词的财务类别
+        
+        Args:
+            text_lower: 小写的文本内容
+            
+        Returns:
+            命中的类别列表，每个类别只出现一次
+        """
+        if self._keyword_automaton is not None:
+            # 单次扫描文本，所有类别都已命中时提前结束
+            found = {}
+            for _, categories in self._keyword_automaton.iter(text_lower):
+                for category in categories:
+                    found.setdefault(category, None)
+                if len(found) == len(self._category_keywords):
+                    break
+            return list(found)
         
-        return list(set(tags))  # 去重
+        matched = []
+        for category, keywords in self._category_keywords.items():
+            for keyword in keywords:
+                if keyword in text_lower:
+                    matched.append(category)
+                    break  # 每个类别只添加一次
+        return matched
     
-    def identify_document_type(self, text: str, filename: str = "") -> str:
+    @_memoize_by_text
+    def identify_document_type(self, text: str, filename: str = "", _text_lower: Optional[str] = None) -> str:
         """
         识别文档类型
         
         Args:
             text: 文档文本内容
             filename: 文件名（可选，用于辅助识别）
+            _text_lower: 调用方已计算好的小写文本（可选）
             
         Returns:
             识别出的文档类型
         """
-        combined_text = (text + " " + filename).lower()
+        # 先在较短的文件名中查找，再只在优先级更高的类型中查找正文，不拼接正文和文件名
+        doc_type = self._search_document_type(filename.lower(), len(self._document_types))
+        candidate_count = self._document_types.index(doc_type) if doc_type else len(self._document_types)
+        if candidate_count:
+            text_lower = _text_lower if _text_lower is not None else text.lower()
+            doc_type = self._search_document_type(text_lower, candidate_count) or doc_type
+        
+        return doc_type or 'financial_report'  # 默认类型
+    
+    def _search_document_type(self, text_lower: str, candidate_count: int) -> Optional[str]:
+        """
+        在前 candidate_count 种文档类型中查找文本匹配的优先级最高的类型
         
-        # 检查每个文档类型的模式
-        for doc_type, patterns in self.document_type_patterns.items():
-            for pattern in patterns:
-                if re.search(pattern, combined_text, re.IGNORECASE):
-                    return doc_type
+        先找候选类型中最靠前的匹配，再只在优先级更高的类型中从该位置继续查找；
+        该位置之前没有任何候选类型匹配，且同一位置上优先级更高的分组已先被尝试
         
-        return 'financial_report'  # 默认类型
+        Args:
+            text_lower: 小写的文本
+            candidate_count: 参与查找的文档类型数量（按优先级从高到低）
+            
+        Returns:
+            匹配的文档类型，没有匹配时返回None
+        """
+        doc_type = None
+        pos = 0
+        while candidate_count:
+            match = self._document_type_prefix_res[candidate_count].search(text_lower, pos)
+            if match is None:
+                break
+            doc_type = match.lastgroup
+            candidate_count = self._document_types.index(doc_type)
+            pos = match.start()
+        
+        return doc_type
     
+    @_memoize_by_text
     def extract_year_from_content(self, text: str, filename: str = "") -> Optional[int]:
         """
         从文本或文件名中提取年份
@@ -346,11 +724,8 @@ class FinancialTagGenerator:
         Returns:
             提取的年份，如果没有找到则返回None
         """
-        combined_text = text + " " + filename
-        
-        # 搜索2000-2099年间的年份模式
-        year_pattern = r'\b(20[0-9]{2})\b'
-        matches = re.findall(year_pattern, combined_text)
+        # 搜索2000-2099年间的年份模式（分别在正文和文件名中查找，避免拼接出整篇文本的副本）
+        matches = _YEAR_RE.findall(text) + _YEAR_RE.findall(filename)
         
         if matches:
             # 尝试找到最近的年份或在特定上下文中提到的年份
@@ -363,6 +738,7 @@ class FinancialTagGenerator:
         
         return None
     
+    @_memoize_by_text
     def extract_quarter_from_content(self, text: str, filename: str = "") -> Optional[str]:
         """
         从文本或文件名中提取季度
@@ -374,24 +750,9 @@ class FinancialTagGenerator:
         Returns:
             提取的季度，如果没有找到则返回None
         """
-        combined_text = text + " " + filename
-        
-        # 定义季度的正则表达式模式
-        quarter_patterns = [
-            (r'\bQ([1-4])\b', r'Q\1'),  # Q1, Q2, Q3, Q4
-            (r'\b第([一二三四])季度\b', lambda m: f"Q{m.group(1).translate(str.maketrans('一二三四', '1234'))}"),
-            (r'\b第一季度\b', r'Q1'),
-            (r'\b第二季度\b', r'Q2'),
-            (r'\b第三季度\b', r'Q3'),
-            (r'\b第四季度\b', r'Q4'),
-            (r'\b一季度\b', r'Q1'),
-            (r'\b二季度\b', r'Q2'),
-            (r'\b三季度\b', r'Q3'),
-            (r'\b四季度\b', r'Q4')
-        ]
-        
-        for pattern, replacement in quarter_patterns:
-            match = re.search(pattern, combined_text, re.IGNORECASE)
+        for pattern, replacement in _QUARTER_PATTERNS:
+            # 与在"正文 文件名"上查找等价：正文中的匹配优先，其次才是文件名
+            match = pattern.search(text) or pattern.search(filename)
             if match:
                 if callable(replacement):
                     return replacement(match)
@@ -442,67 +803,6 @@ class FinancialTagGenerator:
         
         return enhanced_metadata
     
-    def _contains_financial_amounts(self, text: str) -> bool:
-        """
-        检查文本是否包含财务金额
-        
-        Args:
-            text: 待检查的文本
-            
-        Returns:
-            是否包含财务金额
-        """
-        # 匹配数字模式，例如 $100,000, 100万元, 1,000.00
-        amount_patterns = [
-            r'\$?\d{1,3}(,\d{3})*(\.\d{1,2})?\s*(million|billion|trillion|万|亿)?',
-            r'\d+(\.\d+)?\s*(元|美元|欧元|英镑)'
-        ]
-        
-        for pattern in amount_patterns:
-            if re.search(pattern, text, re.IGNORECASE):
-                return True
-        
-        return False
-    
-    def _contains_percentages(self, text: str) -> bool:
-        """
-        检查文本是否包含百分比
-        
-        Args:
-            text: 待检查的文本
-            
-        Returns:
-            是否包含百分比
-        """
-        percentage_pattern = r'\d+(\.\d+)?\s*%'
-        return bool(re.search(percentage_pattern, text))
-    
-    def _contains_time_references(self, text: str) -> bool:
-        """
-        检查文本是否包含时间参考
-        
-        Args:
-            text: 待检查的文本
-            
-        Returns:
-            是否包含时间参考
-        """
-        time_patterns = [
-            r'\b(\d{1,2})[-/](\d{1,2})[-/](\d{2,4})\b',  # 日期格式
-            r'\b(\d{4})[-/](\d{1,2})[-/](\d{1,2})\b',
-            r'\b(january|february|march|april|may|june|july|august|september|october|november|december)\b',
-            r'\b(一月|二月|三月|四月|五月|六月|七月|八月|九月|十月|十一月|十二月)\b',
-            r'\bQ[1-4]\b',  # 季度
-            r'\b(第一|第二|第三|第四)季度\b'
-        ]
-        
-        text_lower = text.lower()
-        for pattern in time_patterns:
-            if re.search(pattern, text_lower):
-                return True
-        
-        return False
-    
     def _generate_document_alias(self, filename: str, metadata: Dict[str, Any]) -> str:
         """
         生成文档别名
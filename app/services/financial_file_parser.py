@@ -0,0 +1,211 @@
+# -*- coding: utf-8 -*-
+"""
+财务文件解析模块
+
+文档解析在进程池的子进程中执行，子进程只导入本模块，
+不会导入 financial_document_processor 及其全局实例
+"""
+import os
+import codecs
+import importlib
+import logging
+from functools import lru_cache
+from typing import Dict, Any
+
+from charset_normalizer import from_bytes
+
+# 可选依赖：基于PDFium的PDF文本提取，未安装时回退到PyPDF2
+try:
+    import pypdfium2 as pdfium
+except ImportError:
+    pdfium = None
+
+# 配置日志
+logger = logging.getLogger(__name__)
+
+# 检测文本编码时读取的文件头字节数
+ENCODING_SAMPLE_BYTES = 1024 * 1024
+
+
+def process_financial_file(file_path: str, file_name: str) -> Dict[str, Any]:
+    """
+    处理单个财务文件并提取内容（模块级函数，在进程池的子进程中执行）
+    
+    参数：
+    - file_path: 文件路径
+    - file_name: 文件名
+    
+    返回：
+    - 包含文件名和内容的字典
+    """
+    try:
+        logger.info(f"开始处理文件: {file_name} ({file_path})")
+        
+        # 根据文件扩展名处理不同类型的文件
+        file_ext = os.path.splitext(file_name)[1].lower()
+        content = ""
+        
+        if file_ext in [".txt", ".md"]:
+            # 文本文件
+            content = _read_text_file(file_path)
+        
+        elif file_ext == ".pdf":
+            # PDF文件 - 优先使用pypdfium2，未安装时尝试导入PyPDF2进行处理
+            try:
+                content = _extract_pdf_text(file_path)
+            except ImportError:
+                logger.warning("pypdfium2和PyPDF2均未安装，无法处理PDF文件")
+                return {
+                    'file_name': file_name,
+                    'content': "",
+                    'error': "PDF处理模块未安装"
+                }
+            except Exception as e:
+                logger.error(f"处理PDF文件时出错: {str(e)}")
+                return {
+                    'file_name': file_name,
+                    'content': "",
+                    'error': f"PDF处理错误: {str(e)}"
+                }
+        
+        elif file_ext in [".docx", ".doc"]:
+            # Word文件 - 尝试导入python-docx进行处理
+            docx = _load_optional_module('docx')
+            try:
+                if docx is None:
+                    raise ImportError("docx")
+                doc = docx.Document(file_path)
+                content = "\n".join([para.text for para in doc.paragraphs])
+            except ImportError:
+                logger.warning("python-docx未安装，无法处理Word文件")
+                return {
+                    'file_name': file_name,
+                    'content': "",
+                    'error': "Word处理模块未安装"
+                }
+            except Exception as e:
+                logger.error(f"处理Word文件时出错: {str(e)}")
+                return {
+                    'file_name': file_name,
+                    'content': "",
+                    'error': f"Word处理错误: {str(e)}"
+                }
+        
+        else:
+            logger.warning(f"不支持的文件格式: {file_ext}")
+            # 尝试作为文本文件读取
+            try:
+                content = _read_text_file(file_path)
+            except:
+                content = ""
+        
+        logger.info(f"文件 {file_name} 处理完成，内容长度: {len(content)} 字符")
+        
+        return {
+            'file_name': file_name,
+            'content': content
+        }
+        
+    except Exception as e:
+        logger.error(f"处理文件 {file_name} 时出错: {str(e)}")
+        return {
+            'file_name': file_name,
+            'content': "",
+            'error': str(e)
+        }
+
+
+@lru_cache(maxsize=None)
+def _load_optional_module(module_name: str):
+    """
+    首次使用时导入可选的文档解析库，结果（包括未安装）在进程内缓存
+    
+    参数：
+    - module_name: 模块名
+    
+    返回：
+    - 模块对象，未安装时返回 None
+    """
+    try:
+        return importlib.import_module(module_name)
+    except ImportError:
+        return None
+
+
+@lru_cache(maxsize=256)
+def _detect_text_encoding(file_path: str, mtime_ns: int, size: int) -> str:
+    """
+    根据文件头检测文本编码，结果按 (路径, 修改时间, 大小) 缓存
+    
+    参数：
+    - file_path: 文件路径
+    - mtime_ns: 文件修改时间，仅用作缓存键
+    - size: 文件大小，仅用作缓存键
+    
+    返回：
+    - 编码名称
+    """
+    with open(file_path, 'rb') as f:
+        sample = f.read(ENCODING_SAMPLE_BYTES)
+    
+    # 绝大多数文件是UTF-8，先做增量解码校验（样本末尾可能截断在多字节字符中间）
+    try:
+        codecs.getincrementaldecoder('utf-8')().decode(sample, final=len(sample) < ENCODING_SAMPLE_BYTES)
+        return 'utf-8'
+    except UnicodeDecodeError:
+        pass
+    
+    # GB18030等中文编码的财务文档交给charset-normalizer识别
+    match = from_bytes(sample).best()
+    if match is not None:
+        return match.encoding
+    return 'utf-8'
+
+
+def _read_text_file(file_path: str) -> str:
+    """
+    按检测到的编码读取文本文件
+    
+    参数：
+    - file_path: 文件路径
+    
+    返回：
+    - 文件文本内容
+    """
+    stat = os.stat(file_path)
+    encoding = _detect_text_encoding(file_path, stat.st_mtime_ns, stat.st_size)
+    
+    with open(file_path, 'r', encoding=encoding, errors='ignore') as f:
+        return f.read()
+
+
+def _extract_pdf_text(file_path: str) -> str:
+    """
+    提取PDF文件的全部文本
+
+    参数：
+    - file_path: PDF文件路径
+
+    返回：
+    - 各页文本拼接后的内容
+    """
+    if pdfium is not None:
+        pdf = pdfium.PdfDocument(file_path)
+        try:
+            parts = []
+            for page in pdf:
+                textpage = page.get_textpage()
+                parts.append(textpage.get_text_range())
+                # 每页处理完立即释放，控制大文件的内存占用
+                textpage.close()
+                page.close()
+            return "".join(parts)
+        finally:
+            pdf.close()
+
+    PyPDF2 = _load_optional_module('PyPDF2')
+    if PyPDF2 is None:
+        raise ImportError("PyPDF2")
+    with open(file_path, 'rb') as f:
+        reader = PyPDF2.PdfReader(f)
+        return "".join(page.extract_text() or "" for page in reader.pages)
@@ -5,7 +5,7 @@ from typing import List, Dict, Any, Optional, Tuple
 import logging
 
 from app.store.faiss_store import FaissVectorStore, store_vectors_with_faiss, load_faiss_store
-from app.Embedding.Vectorization import TextVectorizer
+from app.Embedding.Vectorization import global_vectorizer
 
 logger = logging.getLogger(__name__)
 
@@ -32,7 +32,7 @@ class FinancialVectorStore(FaissVectorStore):
         """
         super().__init__(dimension=dimension, storage_path=storage_path)
         self.optimize_for_financial = optimize_for_financial
-        self.financial_vectorizer = TextVectorizer()  # 专用的向量化器
+        self.financial_vectorizer = global_vectorizer  # 共享全局向量化器，避免重复加载向量缓存
         self.metadata_index = {}  # 优化的元数据索引
         self._load_metadata_index()
     
@@ -353,7 +353,7 @@ def vectorize_financial_documents(documents: List[Dict[str, str]], batch_size: i
         }
     }
     
-    vectorizer = TextVectorizer()
+    vectorizer = global_vectorizer
     
     # 批量处理文档
     for i in range(0, len(documents), batch_size):
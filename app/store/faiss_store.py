@@ -7,11 +7,25 @@ import re
 from typing import List, Tuple, Dict, Any
 from datetime import datetime
 
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
 """
 TODO
 写入向量库
 """
 
+# 向量数量达到该阈值后，暴力检索索引改为8bit标量量化存储
+SQ8_MIN_VECTORS = 10000
+# 向量数量达到该阈值后，索引升级为IVF-PQ倒排乘积量化索引
+IVFPQ_MIN_VECTORS = 100000
+# 训练IVF-PQ索引时最多采样的向量数
+IVFPQ_TRAIN_SAMPLE_SIZE = 50000
+# 乘积量化每个子向量的编码位数
+IVFPQ_NBITS = 8
+
 class FaissVectorStore:
     """基于Faiss的向量存储类"""
 
@@ -121,8 +135,9 @@ class FaissVectorStore:
         self.metadata_file = os.path.join(self.storage_path, "metadata.json")
         print(f"DEBUG: 最终index_file = {self.index_file}")
         
-        # 6. 初始化Faiss索引
+        # 6. 初始化Faiss索引，已有索引以文件中记录的维度为准
         self.index = self._load_or_create_index()
+        self.dimension = self.index.d
 
         # 7. 初始化元数据
         self.metadata = self._load_metadata()
@@ -173,6 +188,9 @@ class FaissVectorStore:
         """加载元数据"""
         try:
             if os.path.exists(self.metadata_file):
+                if orjson is not None:
+                    with open(self.metadata_file, 'rb') as f:
+                        return orjson.loads(f.read())
                 with open(self.metadata_file, 'r', encoding='utf-8') as f:
                     return json.load(f)
         except Exception as e:
@@ -225,8 +243,13 @@ class FaissVectorStore:
             # 修复元数据文件路径中的空格问题
             safe_metadata_file = self.metadata_file.replace(' ', '_')
             
-            with open(safe_metadata_file, 'w', encoding='utf-8') as f:
-                json.dump(self.metadata, f, ensure_ascii=False, indent=2)
+            # 元数据包含全部文本，使用紧凑格式写出；orjson直接输出UTF-8字节，序列化更快
+            if orjson is not None:
+                with open(safe_metadata_file, 'wb') as f:
+                    f.write(orjson.dumps(self.metadata, option=orjson.OPT_SERIALIZE_NUMPY))
+            else:
+                with open(safe_metadata_file, 'w', encoding='utf-8') as f:
+                    json.dump(self.metadata, f, ensure_ascii=False)
             
             # 更新元数据文件路径
             self.metadata_file = safe_metadata_file
@@ -244,12 +267,73 @@ class FaissVectorStore:
             self.id_mapping[faiss_id] = custom_id
             self.reverse_id_mapping[custom_id] = faiss_id
 
-    def add_vectors(self, texts: List[str], vectors: List[np.ndarray], source: str = "unknown"):
+    def save(self):
+        """保存索引和元数据"""
+        self._save_index()
+        self._save_metadata()
+
+    def _ivf_index(self):
+        """返回底层的IVF索引，暴力检索索引返回None"""
+        inner = faiss.downcast_index(self.index.index) if isinstance(self.index, faiss.IndexIDMap) else faiss.downcast_index(self.index)
+        return inner if isinstance(inner, faiss.IndexIVF) else None
+
+    def _pq_subquantizers(self) -> int:
+        """选择乘积量化的子向量个数：不超过维度的1/4且能整除维度"""
+        m = max(1, self.dimension // 4)
+        while self.dimension % m:
+            m -= 1
+        return m
+
+    def _maybe_upgrade_index(self):
+        """
+        按向量数量升级索引类型：
+        - 达到SQ8阈值：暴力检索索引改为8bit标量量化存储，内存约为float32的1/4
+        - 达到IVF-PQ阈值：改为IVF-PQ索引，PQ编码将每个向量压缩到m字节，查询只扫描nprobe个聚类
+        """
+        if not isinstance(self.index, faiss.IndexIDMap):
+            return
+        ntotal = self.index.ntotal
+        inner = faiss.downcast_index(self.index.index)
+        if ntotal >= IVFPQ_MIN_VECTORS and not isinstance(inner, faiss.IndexIVF):
+            build = self._build_ivfpq_index
+        elif ntotal >= SQ8_MIN_VECTORS and isinstance(inner, faiss.IndexFlat):
+            build = self._build_sq8_index
+        else:
+            return
+
+        # 量化索引重建时使用解码后的近似向量
+        vectors = inner.reconstruct_n(0, ntotal)
+        ids = faiss.vector_to_array(self.index.id_map)
+        index = faiss.IndexIDMap(build(vectors))
+        index.add_with_ids(vectors, ids)
+        self.index = index
+
+    def _build_sq8_index(self, vectors: np.ndarray):
+        """构建并训练8bit标量量化索引"""
+        index = faiss.IndexScalarQuantizer(self.dimension, faiss.ScalarQuantizer.QT_8bit, faiss.METRIC_INNER_PRODUCT)
+        index.train(vectors)
+        print(f"向量数量达到 {len(vectors)}，已改为8bit标量量化索引")
+        return index
+
+    def _build_ivfpq_index(self, vectors: np.ndarray):
+        """构建并训练IVF-PQ索引"""
+        nlist = int(4 * np.sqrt(len(vectors)))
+        quantizer = faiss.IndexFlatIP(self.dimension)
+        ivfpq = faiss.IndexIVFPQ(quantizer, self.dimension, nlist, self._pq_subquantizers(), IVFPQ_NBITS,
+                                 faiss.METRIC_INNER_PRODUCT)
+        sample = np.random.default_rng().choice(len(vectors), min(IVFPQ_TRAIN_SAMPLE_SIZE, len(vectors)), replace=False)
+        ivfpq.train(vectors[sample])
+        ivfpq.nprobe = max(8, nlist // 32)
+        print(f"向量数量达到 {len(vectors)}，已升级为IVF-PQ索引 (nlist={nlist})")
+        return ivfpq
+
+    def add_vectors(self, texts: List[str], vectors: List[np.ndarray], source: str = "unknown", persist: bool = True):
         """
         添加向量到Faiss索引中
         :param texts: 原始文本列表
         :param vectors: 向量列表
         :param source: 数据来源
+        :param persist: 是否立即保存到磁盘，分批添加时可在最后一批后调用save()统一保存
         """
         if len(texts) != len(vectors):
             raise ValueError("文本数量和向量数量不匹配")
@@ -270,6 +354,7 @@ class FaissVectorStore:
 
         # 添加到Faiss索引
         self.index.add_with_ids(vectors_array, ids)
+        self._maybe_upgrade_index()
 
         # 添加元数据
         for i, text in enumerate(texts):
@@ -290,65 +375,87 @@ class FaissVectorStore:
             self.reverse_id_mapping[custom_id] = faiss_id
 
         # 保存索引和元数据
-        self._save_index()
-        self._save_metadata()
+        if persist:
+            self.save()
 
         print(f"成功添加 {len(vectors)} 条向量数据到Faiss数据库")
 
     def search_similar(self, query_vector: np.ndarray, top_k: int = 5,
-                       filters: Dict[str, Any] = None) -> List[Tuple[str, float, Dict]]:
+                       filters: Dict[str, Any] = None, nprobe: int = None) -> List[Tuple[str, float, Dict]]:
         """
         搜索相似向量（支持元数据过滤）
         :param query_vector: 查询向量
         :param top_k: 返回最相似的前 k 个结果
         :param filters: 过滤器字典，例如 {'source': 'web_scraping', 'min_score': 0.5}
+        :param nprobe: IVF索引查询的聚类个数，仅对IVF-PQ索引生效，默认使用建索引时的设置
         :return: (文本，相似度，元数据) 的元组列表
         """
-        if self.index.ntotal == 0:
-            return []
-
-        # 确保查询向量是正确的形状和类型
         if query_vector.ndim == 1:
             query_vector = query_vector.reshape(1, -1)
+        return self.search_similar_batch(query_vector, top_k, filters, nprobe)[0]
 
-        query_vector = query_vector.astype('float32')
+    def search_similar_batch(self, query_vectors: np.ndarray, top_k: int = 5,
+                             filters: Dict[str, Any] = None, nprobe: int = None) -> List[List[Tuple[str, float, Dict]]]:
+        """
+        批量搜索相似向量，多个查询只调用一次索引搜索
+        :param query_vectors: 查询向量矩阵，形状为 (查询数, 维度)
+        :param top_k: 每个查询返回最相似的前 k 个结果
+        :param filters: 过滤器字典，对所有查询生效
+        :param nprobe: IVF索引查询的聚类个数，仅对IVF-PQ索引生效，默认使用建索引时的设置
+        :return: 与查询顺序一致的结果列表，每项为 (文本，相似度，元数据) 的元组列表
+        """
+        num_queries = len(query_vectors)
+        if self.index.ntotal == 0 or num_queries == 0:
+            return [[] for _ in range(num_queries)]
+
+        # nprobe 通过单次查询的搜索参数传入，不修改共享索引上的设置
+        search_params = None
+        if nprobe is not None and self._ivf_index() is not None:
+            search_params = faiss.SearchParametersIVF()
+            search_params.nprobe = nprobe
+
+        # 确保查询向量是正确的形状和类型（复制一份，归一化不影响调用方的数组）
+        query_vectors = np.array(query_vectors, dtype='float32').reshape(num_queries, -1)
 
         # 归一化查询向量
-        faiss.normalize_L2(query_vector)
+        faiss.normalize_L2(query_vectors)
 
         # 搜索相似向量（获取更多候选用于过滤）
         filter_top_k = top_k * 3 if filters else top_k
-        distances, indices = self.index.search(query_vector, filter_top_k)
-
-        # 构建结果
-        results = []
-        for i, (distance, faiss_id) in enumerate(zip(distances[0], indices[0])):
-            # Faiss 返回 -1 表示没有找到足够的结果
-            if faiss_id == -1:
-                continue
-
-            # 通过 ID 映射找到对应的元数据
-            if faiss_id in self.id_mapping:
-                custom_id = self.id_mapping[faiss_id]
-                if custom_id < len(self.metadata):
-                    metadata = self.metadata[custom_id]
-                    text = metadata["text"]
-                    # 距离是内积，转换为相似度分数
-                    similarity = float(distance)
-                    
-                    # 应用过滤器
-                    if filters:
-                        if not self._apply_filters(metadata, similarity, filters):
-                            continue
-                    
-                    results.append((text, similarity, metadata))
-        
-        # 如果应用了过滤器，可能需要重新排序并截取 top_k
-        if filters and len(results) > top_k:
-            results.sort(key=lambda x: x[1], reverse=True)
-            results = results[:top_k]
-
-        return results
+        distances, indices = self.index.search(query_vectors, filter_top_k, params=search_params)
+
+        all_results = []
+        for row_distances, row_indices in zip(distances, indices):
+            # 构建结果
+            results = []
+            for distance, faiss_id in zip(row_distances, row_indices):
+                # Faiss 返回 -1 表示没有找到足够的结果
+                if faiss_id == -1:
+                    continue
+
+                # 通过 ID 映射找到对应的元数据
+                if faiss_id in self.id_mapping:
+                    custom_id = self.id_mapping[faiss_id]
+                    if custom_id < len(self.metadata):
+                        metadata = self.metadata[custom_id]
+                        text = metadata["text"]
+                        # 距离是内积，转换为相似度分数
+                        similarity = float(distance)
+
+                        # 应用过滤器
+                        if filters:
+                            if not self._apply_filters(metadata, similarity, filters):
+                                continue
+
+                        results.append((text, similarity, metadata))
+
+            # 如果应用了过滤器，可能需要重新排序并截取 top_k
+            if filters and len(results) > top_k:
+                results.sort(key=lambda x: x[1], reverse=True)
+                results = results[:top_k]
+            all_results.append(results)
+
+        return all_results
     
     def _apply_filters(self, metadata: Dict, similarity: float, filters: Dict[str, Any]) -> bool:
         """
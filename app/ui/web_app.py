@@ -501,11 +501,11 @@ def collect_data():
 
                 # Step 6: 向量化并存储到Faiss向量数据库
                 logger.info("开始将数据向量化并存储到Faiss向量数据库...")
-                from app.Embedding.Vectorization import TextVectorizer
+                from app.Embedding.Vectorization import global_vectorizer
                 from app.store.faiss_store import FaissVectorStore
 
-                # 创建向量化器和向量存储实例
-                vectorizer = TextVectorizer()
+                # 复用全局向量化器，创建向量存储实例
+                vectorizer = global_vectorizer
                 vector_store = FaissVectorStore(dimension=128)
 
                 # 准备要向量化的文本内容